@@ -0,0 +1,121 @@
+import copy
+import json
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+API_PREFIX = '/api/'
+NOT_FOUND = 'Адрес не найден.'
+NESTED_BATCH = 'Вложенные пакетные запросы не поддерживаются.'
+NOT_JSON = 'Ответ не является JSON.'
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS,
+    )
+
+
+def make_request(request, url):
+    """GET-подзапрос с пользователем и токеном исходного запроса."""
+    parts = urlsplit(url)
+    sub_request = copy.copy(request._request)
+    sub_request.method = 'GET'
+    sub_request.path = sub_request.path_info = parts.path
+    sub_request.META = {
+        **request.META,
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+    }
+    sub_request.META.pop('HTTP_ACCEPT_ENCODING', None)
+    sub_request.GET = QueryDict(parts.query)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+@lru_cache(maxsize=None)
+def get_handler():
+    """Обработчик с цепочкой MIDDLEWARE для подзапросов."""
+    handler = BaseHandler()
+    handler.load_middleware()
+    return handler
+
+
+def release(response):
+    """Закрывает ресурсы подответа, в том числе места лимитов.
+
+    response.close() не подходит: сигнал request_finished закрыл бы
+    соединение с БД посреди исходного запроса.
+    """
+    for closable in response._closable_objects:
+        closable.close()
+
+
+def get_body(response):
+    if isinstance(response, Response):
+        return response.data
+    if (
+        not response.streaming
+        and response.get('Content-Type', '').startswith('application/json')
+    ):
+        return json.loads(response.content)
+    return None
+
+
+class BatchView(APIView):
+    """Выполняет несколько GET-запросов к API за один HTTP-запрос.
+
+    Подзапросы проходят через MIDDLEWARE, включая лимиты конкурентности,
+    и обычные проверки прав и ограничения частоты, но не
+    аутентифицируются повторно.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response([
+            self.dispatch_one(request, url)
+            for url in serializer.validated_data['requests']
+        ])
+
+    def dispatch_one(self, request, url):
+        path = urlsplit(url).path
+        try:
+            if not path.startswith(API_PREFIX):
+                raise Resolver404
+            match = resolve(path)
+        except Resolver404:
+            return {
+                'status': status.HTTP_404_NOT_FOUND,
+                'body': {'detail': NOT_FOUND},
+            }
+        if getattr(match.func, 'view_class', None) is type(self):
+            return {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': NESTED_BATCH},
+            }
+        response = get_handler().get_response(make_request(request, url))
+        try:
+            body = get_body(response)
+        finally:
+            release(response)
+        if body is None:
+            return {
+                'status': status.HTTP_406_NOT_ACCEPTABLE,
+                'body': {'detail': NOT_JSON},
+            }
+        return {'status': response.status_code, 'body': body}
@@ -0,0 +1,118 @@
+import gzip
+import zlib
+from functools import partial
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header)
+    if brotli is not None and BROTLI in encodings:
+        return BROTLI
+    if GZIP in encodings:
+        return GZIP
+    return None
+
+
+def compress(content, encoding, level=None):
+    if encoding == BROTLI:
+        if level is None:
+            level = settings.BROTLI_QUALITY
+        return brotli.compress(content, quality=level)
+    if level is None:
+        level = settings.GZIP_LEVEL
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток по мере поступления.
+
+    Сжатые данные сбрасываются клиенту, когда накопится
+    COMPRESSION_STREAM_BUFFER байт входа: sync flush после каждого мелкого
+    куска обнуляет выгоду от сжатия.
+    """
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        process = compressor.process
+        flush = compressor.flush
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(
+            settings.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        process = compressor.compress
+        flush = partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    pending = 0
+    for chunk in chunks:
+        data = process(chunk)
+        pending += len(chunk)
+        if pending >= settings.COMPRESSION_STREAM_BUFFER:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы разрешённых типов, включая потоковые."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type.strip() not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,220 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from recipes.throttling import rejection_counts
+
+OVERLOADED = 'Сервер перегружен, повторите запрос позже.'
+BACKOFF = 0.9
+SMOOTHING = 0.1
+
+
+class Limiter:
+    """Лимит одновременных запросов области по схеме AIMD.
+
+    Пока задержка укладывается в цель, лимит растёт примерно на единицу
+    за каждые limit запросов; при превышении или ошибке умножается на
+    BACKOFF, но не чаще раза за целевую задержку, чтобы пачка медленных
+    ответов одного эпизода не обрушила лимит до минимума.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency, priority):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = latency
+        self.priority = priority
+        self.inflight = 0
+        self.shed = 0
+        self.latency = None
+        self.decreased = None
+
+    def acquire(self):
+        if self.inflight >= int(self.limit):
+            self.shed += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def observe(self, elapsed):
+        self.latency = elapsed if self.latency is None else (
+            self.latency + SMOOTHING * (elapsed - self.latency)
+        )
+
+    def increase(self):
+        if self.inflight * 2 >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def decrease(self, now):
+        if self.decreased is not None and now - self.decreased < self.target:
+            return
+        self.decreased = now
+        self.limit = max(self.minimum, self.limit * BACKOFF)
+
+
+class Limiters:
+    """Лимиты областей процесса.
+
+    Перегрузка области снижает и лимиты областей с меньшим приоритетом:
+    тяжёлые запросы отсекаются первыми, дешёвые чтения остаются быстрыми.
+    Вместе области занимают не больше CONCURRENCY_TOTAL потоков воркера,
+    так что свободный поток всегда есть: лишние тяжёлые запросы сразу
+    получают 503, а не ждут в очереди воркера.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limiters = None
+
+    def get_limiters(self):
+        if self.limiters is None:
+            self.limiters = {
+                scope: Limiter(**options)
+                for scope, options in settings.CONCURRENCY_LIMITS.items()
+            }
+        return self.limiters
+
+    def acquire(self, scope):
+        with self.lock:
+            limiters = self.get_limiters()
+            inflight = sum(limiter.inflight for limiter in limiters.values())
+            if inflight >= settings.CONCURRENCY_TOTAL:
+                limiters[scope].shed += 1
+                return False
+            return limiters[scope].acquire()
+
+    def release(self, scope, elapsed, failed):
+        now = time.monotonic()
+        with self.lock:
+            limiters = self.get_limiters()
+            limiter = limiters[scope]
+            limiter.observe(elapsed)
+            if not failed and elapsed <= limiter.target:
+                limiter.increase()
+            else:
+                for other in limiters.values():
+                    if other.priority <= limiter.priority:
+                        other.decrease(now)
+            limiter.inflight -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                scope: {
+                    'limit': int(limiter.limit),
+                    'inflight': limiter.inflight,
+                    'shed': limiter.shed,
+                    'latency_ms': None if limiter.latency is None else round(
+                        limiter.latency * 1000, 1
+                    ),
+                    'priority': limiter.priority,
+                }
+                for scope, limiter in self.get_limiters().items()
+            }
+
+
+limiters = Limiters()
+
+
+class Permit:
+    """Занятое место в области; освобождается ровно один раз."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.started = time.monotonic()
+        self.failed = False
+        self.released = False
+
+    def close(self):
+        if self.released:
+            return
+        self.released = True
+        limiters.release(
+            self.scope, time.monotonic() - self.started, self.failed
+        )
+
+
+def get_scope(view_func, method):
+    """Область из view.concurrency_scopes по action вьюсета или методу."""
+    view = getattr(view_func, 'cls', None) or getattr(
+        view_func, 'view_class', None
+    )
+    if view is None:
+        return None
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return getattr(view, 'concurrency_scopes', {}).get(
+        actions.get(method, method)
+    )
+
+
+def overloaded():
+    response = JsonResponse(
+        {'detail': OVERLOADED},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        json_dumps_params={'ensure_ascii': False}
+    )
+    response['Retry-After'] = settings.CONCURRENCY_RETRY_AFTER
+    return response
+
+
+class ConcurrencyLimitMiddleware:
+    """Сразу отвечает 503, если область запроса исчерпала лимит.
+
+    Для потоковых ответов место освобождается после отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        if not settings.CONCURRENCY_LIMITS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        permit = getattr(request, 'concurrency_permit', None)
+        if permit is not None:
+            permit.failed = response.status_code >= 500
+            if response.streaming:
+                response._closable_objects.append(permit)
+            else:
+                permit.close()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        scope = get_scope(view_func, request.method)
+        if scope is None or scope not in settings.CONCURRENCY_LIMITS:
+            return None
+        if not limiters.acquire(scope):
+            return overloaded()
+        request.concurrency_permit = Permit(scope)
+        return None
+
+
+class HealthView(APIView):
+    """Состояние процесса: БД, лимиты конкурентности и отказы throttling."""
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        try:
+            connection.ensure_connection()
+            database = True
+        except DatabaseError:
+            database = False
+        return Response(
+            {
+                'database': database,
+                'concurrency': limiters.snapshot(),
+                'throttled': rejection_counts(),
+            },
+            status=status.HTTP_200_OK if database
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
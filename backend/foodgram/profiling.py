@@ -0,0 +1,234 @@
+import hashlib
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+OTHER = '[other]'
+UNRESOLVED = '[unresolved]'
+MAX_DEPTH = 100
+TOKEN_CACHE_TIMEOUT = 60
+
+
+def collapse(frame):
+    """Стек кадра в формате collapsed: от корня к листу через ';'."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append('{}.{}'.format(
+            frame.f_globals.get('__name__', '?'), frame.f_code.co_name
+        ))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Фоновый поток, который снимает стеки профилируемых потоков.
+
+    Поток запускается при первом профилируемом запросе и спит, пока
+    таких запросов нет.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id):
+        samples = Counter()
+        with self.lock:
+            self.active[thread_id] = samples
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='profiler', daemon=True
+                )
+                self.thread.start()
+        self.wakeup.set()
+        return samples
+
+    def stop(self, thread_id):
+        with self.lock:
+            self.active.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                if not self.active:
+                    self.wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse(frame)] += 1
+            del frames
+            time.sleep(settings.PROFILER_INTERVAL)
+
+
+class Profiles:
+    """Стеки процесса, сгруппированные по действию представления."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.stacks = defaultdict(Counter)
+        self.requests = Counter()
+        self.size = 0
+
+    def add(self, key, samples):
+        with self.lock:
+            self.requests[key] += 1
+            stacks = self.stacks[key]
+            for stack, count in samples.items():
+                if stack not in stacks:
+                    if self.size >= settings.PROFILER_MAX_STACKS:
+                        stack = OTHER
+                    else:
+                        self.size += 1
+                stacks[stack] += count
+
+    def collapsed(self, key=None):
+        with self.lock:
+            return '\n'.join(
+                f'{name};{stack} {count}'
+                for name, stacks in sorted(self.stacks.items())
+                if key is None or name == key
+                for stack, count in stacks.most_common()
+            )
+
+    def reset(self):
+        with self.lock:
+            self.clear()
+
+
+sampler = Sampler()
+profiles = Profiles()
+
+
+def get_key(request):
+    """Имя действия: класс представления и action вьюсета или метод."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    method = request.method.lower()
+    view = getattr(match.func, 'cls', None)
+    if view is not None:
+        actions = getattr(match.func, 'actions', None) or {}
+        return f'{view.__name__}.{actions.get(method, method)}'
+    view = getattr(match.func, 'view_class', match.func)
+    return f'{view.__name__}.{method}'
+
+
+def is_staff(request):
+    """Сотрудник по сессии или по токену.
+
+    Ответ для токена кэшируется на TOKEN_CACHE_TIMEOUT, чтобы заголовок
+    X-Profile от посторонних клиентов не стоил запроса к БД каждый раз.
+    """
+    if request.user.is_staff:
+        return True
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if not header:
+        return False
+    key = 'profiler:staff:' + hashlib.sha256(header.encode()).hexdigest()
+    staff = cache.get(key)
+    if staff is None:
+        try:
+            authenticated = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            authenticated = None
+        staff = authenticated is not None and authenticated[0].is_staff
+        cache.set(key, staff, TOKEN_CACHE_TIMEOUT)
+    return staff
+
+
+class Profile:
+    """Сэмплы одного запроса; сохраняются ровно один раз."""
+
+    def __init__(self, request):
+        self.request = request
+        self.thread_id = threading.get_ident()
+        self.samples = sampler.start(self.thread_id)
+        self.closed = False
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        sampler.stop(self.thread_id)
+        profiles.add(get_key(self.request), self.samples)
+
+
+class ProfilerMiddleware:
+    """Статистический профилировщик запросов.
+
+    Профилируется доля PROFILER_SAMPLE_RATE запросов и запросы сотрудников
+    с заголовком X-Profile. Стоит после AuthenticationMiddleware, чтобы
+    видеть пользователя сессии. Остальные запросы проходят без накладных
+    расходов, кроме проверки заголовка. Потоковые ответы профилируются до
+    конца отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            threading.get_ident() in sampler.active
+            or not self.should_profile(request)
+        ):
+            return self.get_response(request)
+        profile = Profile(request)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            profile.close()
+            raise
+        if response.streaming:
+            response._closable_objects.append(profile)
+            return response
+        profile.close()
+        response['X-Profile-Samples'] = sum(profile.samples.values())
+        return response
+
+    def should_profile(self, request):
+        rate = settings.PROFILER_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return True
+        return 'HTTP_X_PROFILE' in request.META and is_staff(request)
+
+
+class ProfilerView(APIView):
+    """Стеки в формате collapsed для flamegraph.pl или speedscope.
+
+    Данные собираются в памяти процесса: при нескольких воркерах каждый
+    отдаёт свои.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            profiles.collapsed(request.query_params.get('view')),
+            content_type='text/plain; charset=utf-8'
+        )
+
+    def delete(self, request):
+        profiles.reset()
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
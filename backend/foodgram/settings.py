@@ -25,14 +25,19 @@ INSTALLED_APPS = [
     'djoser',
     'users',
     'recipes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'foodgram.concurrency.ConcurrencyLimitMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.hashing.HashingBusyMiddleware',
+    'foodgram.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,10 +71,29 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+PASSWORD_HASHERS = os.getenv('PASSWORD_HASHERS', default=','.join((
+    'users.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+))).split(',')
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', default=2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', default=19456))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', default=1))
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', default=4))
+PASSWORD_HASHING_WORKERS = int(
+    os.getenv('PASSWORD_HASHING_WORKERS', default=1)
+)
+PASSWORD_HASHING_QUEUE = max(min(
+    int(os.getenv('PASSWORD_HASHING_QUEUE', default=WORKER_THREADS // 2)),
+    WORKER_THREADS - 1
+), 1)
+PASSWORD_HASHING_RETRY_AFTER = 1
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,10 +117,31 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'recipes.paginations.QueryParamLimitPagination',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'recipes.throttling.SlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'search': os.getenv('THROTTLE_SEARCH', default='120/min'),
+        'write': os.getenv('THROTTLE_WRITE', default='60/min'),
+        'export': os.getenv('THROTTLE_EXPORT', default='10/min'),
+        'auth': os.getenv('THROTTLE_AUTH', default='10/min'),
+    },
+    'NUM_PROXIES': 1,
     'SEARCH_PARAM': 'name'
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 LANGUAGE_CODE = 'ru-RU'
 
 TIME_ZONE = 'Europe/Moscow'
@@ -110,3 +155,105 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+MEMBERSHIP_CACHE_TIMEOUT = int(
+    os.getenv('MEMBERSHIP_CACHE_TIMEOUT', default=0)
+)
+MEMBERSHIP_FILTER_LIMIT = 500
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', default=6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', default=5))
+COMPRESSION_STREAM_BUFFER = 16 * 1024
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/yaml',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+)
+PRECOMPRESS_EXTENSIONS = (
+    '.css', '.html', '.js', '.json', '.map', '.svg', '.txt', '.yml'
+)
+
+TIMELINE_LENGTH = 500
+TIMELINE_PAGE_SIZE = 20
+TIMELINE_FANOUT_LIMIT = int(
+    os.getenv('TIMELINE_FANOUT_LIMIT', default=10000)
+)
+
+SIMILAR_RECIPES_COUNT = 20
+SIMILARITY_INGREDIENTS_WEIGHT = 0.7
+SIMILARITY_FAVORITES_WEIGHT = 0.3
+SIMILARITY_CANDIDATES = 500
+SIMILARITY_MAX_INGREDIENT_SHARE = 0.05
+
+RECIPE_IDS_LIMIT = 100
+RECIPE_INGREDIENTS_FILTER_LIMIT = 10
+BATCH_MAX_REQUESTS = 20
+
+RECIPE_SNAPSHOTS = os.getenv('RECIPE_SNAPSHOTS', default='True') == 'True'
+
+POPULARITY_BUCKET_SECONDS = 3600
+POPULARITY_WINDOW_BUCKETS = 24 * 7
+POPULARITY_FLUSH_INTERVAL = int(
+    os.getenv('POPULARITY_FLUSH_INTERVAL', default=60)
+)
+TRENDING_HALF_LIFE = 24 * 3600
+
+DELETE_BATCH_SIZE = 500
+
+DUPLICATE_RECIPE_POLICY = os.getenv(
+    'DUPLICATE_RECIPE_POLICY', default='flag'
+)
+DUPLICATE_SIMILARITY_THRESHOLD = 0.8
+
+CURSOR_PAGE_SIZE = 20
+CURSOR_MAX_PAGE_SIZE = 100
+
+WARMUP_URLS = (
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/?limit=6',
+    '/api/users/directory/?limit=6',
+)
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', default='True') == 'True'
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', default=0))
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', default=0.005))
+PROFILER_MAX_STACKS = 10000
+
+CONCURRENCY_TOTAL = max(WORKER_THREADS - 1, 1)
+CONCURRENCY_LIMITS = {
+    'list': {
+        'initial': CONCURRENCY_TOTAL, 'minimum': 1,
+        'maximum': CONCURRENCY_TOTAL, 'latency': 0.5, 'priority': 2,
+    },
+    'write': {
+        'initial': max(WORKER_THREADS // 2, 1), 'minimum': 1,
+        'maximum': max(WORKER_THREADS // 2, 1), 'latency': 1.0,
+        'priority': 1,
+    },
+    'export': {
+        'initial': 1, 'minimum': 1, 'maximum': max(WORKER_THREADS // 4, 1),
+        'latency': 5.0, 'priority': 0,
+    },
+} if os.getenv('CONCURRENCY_LIMITING', default='True') == 'True' else {}
+CONCURRENCY_RETRY_AFTER = 1
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+SYNC_BATCH_SIZE = 500
+SYNC_MAX_BATCH_SIZE = 1000
+SYNC_RETENTION_DAYS = 30
+
+JOBS_EAGER = os.getenv('JOBS_EAGER', default='') == 'True'
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10
+JOBS_VISIBILITY_TIMEOUT = 300
+JOBS_POLL_INTERVAL = 1
+JOBS_RETENTION_DAYS = 7
+JOBS_PRUNE_INTERVAL = 3600
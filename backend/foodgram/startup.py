@@ -0,0 +1,70 @@
+import gc
+import logging
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import get_resolver, resolve
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = (
+    'rest_framework.authtoken.views',
+    'rest_framework.renderers',
+    'djoser.serializers',
+    'djoser.views',
+    'django_filters.rest_framework',
+    'foodgram.batch',
+    'recipes.fast_serializers',
+    'recipes.similarity',
+    'recipes.fingerprints',
+)
+
+
+def preload():
+    """Вызывается в мастере до форка.
+
+    Всё, что импортировано здесь, воркеры получают общими страницами
+    памяти; gc.freeze убирает эти объекты из сборки мусора, чтобы она
+    не трогала их заголовки и не копировала страницы.
+    """
+    for name in PRELOAD_MODULES:
+        import_module(name)
+    get_resolver().reverse_dict
+    get_hashers()
+    gc.freeze()
+
+
+def warmup():
+    """Вызывается в воркере до приёма запросов и никогда не падает.
+
+    Прогоняет типовые запросы, чтобы первые пользователи не платили за
+    ленивую инициализацию Django и DRF. Соединения с БД у gthread свои в
+    каждом потоке, поэтому соединения этого потока закрываются в конце.
+    """
+    try:
+        connections.close_all()
+    except Exception:
+        logger.exception('Closing inherited connections failed')
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if host not in ('*', '')),
+        'localhost'
+    ).lstrip('.')
+    factory = RequestFactory(HTTP_HOST=host)
+    for url in settings.WARMUP_URLS:
+        try:
+            match = resolve(urlsplit(url).path)
+            response = match.func(
+                factory.get(url), *match.args, **match.kwargs
+            )
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception:
+            logger.exception('Warmup request %s failed', url)
+    try:
+        connections.close_all()
+    except Exception:
+        logger.exception('Closing warmup connections failed')
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from foodgram import concurrency
+
+LIMITS = {
+    'list': {
+        'initial': 2, 'minimum': 1, 'maximum': 3,
+        'latency': 0.5, 'priority': 2,
+    },
+    'export': {
+        'initial': 2, 'minimum': 1, 'maximum': 2,
+        'latency': 5.0, 'priority': 0,
+    },
+}
+
+
+@override_settings(CONCURRENCY_LIMITS=LIMITS, CONCURRENCY_TOTAL=3)
+class LimitersTest(TestCase):
+    def setUp(self):
+        self.limiters = concurrency.Limiters()
+
+    def test_scope_limit(self):
+        self.assertTrue(self.limiters.acquire('export'))
+        self.assertTrue(self.limiters.acquire('export'))
+        self.assertFalse(self.limiters.acquire('export'))
+        self.limiters.release('export', 0.1, False)
+        self.assertTrue(self.limiters.acquire('export'))
+
+    def test_total_limit_keeps_a_thread_free(self):
+        self.assertTrue(self.limiters.acquire('list'))
+        self.assertTrue(self.limiters.acquire('list'))
+        self.assertTrue(self.limiters.acquire('export'))
+        self.assertFalse(self.limiters.acquire('export'))
+        self.assertEqual(self.limiters.snapshot()['export']['shed'], 1)
+
+    def test_backoff_once_per_window(self):
+        for _ in range(2):
+            self.limiters.acquire('list')
+        with mock.patch('time.monotonic', return_value=100.0):
+            self.limiters.release('list', 1.0, False)
+            self.limiters.release('list', 1.0, False)
+        limits = self.limiters.get_limiters()
+        self.assertAlmostEqual(limits['list'].limit, 2 * concurrency.BACKOFF)
+        self.assertAlmostEqual(
+            limits['export'].limit, 2 * concurrency.BACKOFF
+        )
+
+    def test_backoff_spares_higher_priority(self):
+        self.limiters.acquire('export')
+        self.limiters.release('export', 0, True)
+        limits = self.limiters.get_limiters()
+        self.assertEqual(limits['list'].limit, 2)
+        self.assertLess(limits['export'].limit, 2)
+
+    def test_additive_increase_under_load(self):
+        self.limiters.acquire('list')
+        self.limiters.acquire('list')
+        self.limiters.release('list', 0.1, False)
+        self.assertAlmostEqual(
+            self.limiters.get_limiters()['list'].limit, 2.5
+        )
+
+
+@override_settings(CONCURRENCY_LIMITS=LIMITS, CONCURRENCY_TOTAL=3)
+class ConcurrencyLimitMiddlewareTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            concurrency, 'limiters', concurrency.Limiters()
+        )
+        self.limiters = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shed_with_retry_after(self):
+        self.limiters.acquire('list')
+        self.limiters.acquire('list')
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_unlimited_endpoints_pass(self):
+        self.limiters.acquire('list')
+        self.limiters.acquire('list')
+        self.limiters.acquire('export')
+        self.assertEqual(self.client.get('/api/tags/').status_code, 200)
+        self.assertEqual(self.client.get('/api/health/').status_code, 200)
+
+    def test_permit_released(self):
+        self.client.get('/api/recipes/')
+        self.assertEqual(self.limiters.snapshot()['list']['inflight'], 0)
+
+    def test_streaming_permit_released_on_close(self):
+        self.limiters.acquire('export')
+        response = mock.Mock(streaming=True, status_code=200)
+        response._closable_objects = []
+        request = mock.Mock(concurrency_permit=concurrency.Permit('export'))
+        concurrency.ConcurrencyLimitMiddleware(lambda request: response)(
+            request
+        )
+        self.assertEqual(self.limiters.snapshot()['export']['inflight'], 1)
+        for closable in response._closable_objects:
+            closable.close()
+        self.assertEqual(self.limiters.snapshot()['export']['inflight'], 0)
+
+    def test_batch_sub_requests_are_limited(self):
+        self.limiters.acquire('list')
+        self.limiters.acquire('list')
+        response = self.client.post(
+            '/api/batch/',
+            {'requests': ['/api/recipes/', '/api/tags/', '/admin/']},
+            content_type='application/json'
+        )
+        self.assertEqual(
+            [item['status'] for item in response.json()], [503, 200, 404]
+        )
+        self.assertEqual(self.limiters.snapshot()['list']['inflight'], 2)
@@ -1,8 +1,16 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from .batch import BatchView
+from .concurrency import HealthView
+from .profiling import ProfilerView
+
 urlpatterns = [
     path('api/', include('users.urls', namespace='users')),
     path('api/', include('recipes.urls', namespace='recipes')),
+    path('api/', include('jobs.urls', namespace='jobs')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    path('api/health/', HealthView.as_view(), name='health'),
+    path('api/profiler/', ProfilerView.as_view(), name='profiler'),
     path('admin/', admin.site.urls),
 ]
@@ -0,0 +1,92 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from jobs.queue import claim, prune, run
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает обработчик фоновых задач. Когда очередь пуста, раз в '
+        'JOBS_PRUNE_INTERVAL удаляет завершённые задачи старше '
+        'JOBS_RETENTION_DAYS.'
+    )
+
+    pruned = None
+    prune_lock = threading.Lock()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='exit when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        stop = multiprocessing.get_context('fork').Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        connections.close_all()
+        processes = [
+            multiprocessing.get_context('fork').Process(
+                target=self.run_threads,
+                args=(stop, options['threads'], options['once'])
+            )
+            for _ in range(options['processes'] - 1)
+        ]
+        for process in processes:
+            process.start()
+        self.run_threads(stop, options['threads'], options['once'])
+        for process in processes:
+            process.join()
+
+    def run_threads(self, stop, count, once):
+        threads = [
+            threading.Thread(target=self.work, args=(stop, once))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def work(self, stop, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = claim()
+                if job is not None:
+                    run(job)
+                elif once:
+                    return
+                else:
+                    self.prune()
+                    stop.wait(settings.JOBS_POLL_INTERVAL)
+        finally:
+            connections.close_all()
+
+    def prune(self):
+        if not self.prune_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if (
+                self.pruned is not None
+                and now - self.pruned < settings.JOBS_PRUNE_INTERVAL
+            ):
+                return
+            self.pruned = now
+            prune()
+        except Exception:
+            logger.exception('Pruning finished jobs failed')
+        finally:
+            self.prune_lock.release()
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+from users.models import User
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+    task = models.CharField(verbose_name='Задача', max_length=100)
+    payload = models.TextField(verbose_name='Аргументы', default='{}')
+    result = models.TextField(verbose_name='Результат', blank=True)
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    status = models.CharField(
+        verbose_name='Статус', max_length=10, choices=STATUSES,
+        default=QUEUED
+    )
+    priority = models.SmallIntegerField(verbose_name='Приоритет', default=0)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки', default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток', default=3
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Не раньше', default=timezone.now
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до', null=True, blank=True
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='jobs', verbose_name='Пользователь'
+    )
+    created = models.DateTimeField(verbose_name='Создана', auto_now_add=True)
+    finished = models.DateTimeField(
+        verbose_name='Завершена', null=True, blank=True
+    )
+
+    class Meta:
+        ordering = ('-priority', 'id')
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'id'], name='job_queue_idx'
+            ),
+            models.Index(fields=['finished'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.id}'
@@ -0,0 +1,118 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+CLAIM_CANDIDATES = 10
+PRUNE_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, user=None, priority=0, max_attempts=None, **payload):
+    if name not in TASKS:
+        raise KeyError(f'Unknown task "{name}"')
+    job = Job.objects.create(
+        task=name,
+        payload=json.dumps(payload),
+        user=user,
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_EAGER:
+        job = claim(Job.objects.filter(pk=job.pk))
+        run(job)
+        job.refresh_from_db()
+    return job
+
+
+def claimable(now):
+    return Q(status=Job.QUEUED, run_after__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now
+    )
+
+
+def claim(queryset=None):
+    """Забирает задачу с наибольшим приоритетом.
+
+    Захват — условный UPDATE, поэтому воркеры не блокируют друг друга,
+    а задачи с истёкшим locked_until забираются повторно.
+    """
+    queryset = Job.objects.all() if queryset is None else queryset
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT)
+    candidates = queryset.filter(claimable(now)).order_by(
+        '-priority', 'id'
+    ).values_list('id', flat=True)[:CLAIM_CANDIDATES]
+    for pk in candidates:
+        claimed = Job.objects.filter(claimable(now), pk=pk).update(
+            status=Job.RUNNING,
+            locked_until=locked_until,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def finish(job, **fields):
+    return Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_until=job.locked_until
+    ).update(**fields)
+
+
+def run(job):
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        finish(job, status=Job.FAILED, finished=now)
+        return
+    try:
+        result = TASKS[job.task](**json.loads(job.payload))
+    except Exception:
+        logger.exception('Job %s failed', job)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            finish(job, status=Job.FAILED, error=error, finished=now)
+        else:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            finish(
+                job, status=Job.QUEUED, error=error,
+                run_after=now + timedelta(seconds=delay)
+            )
+        return
+    finish(
+        job, status=Job.DONE, result=json.dumps(result, ensure_ascii=False),
+        finished=timezone.now()
+    )
+
+
+def prune(days=None):
+    """Удаляет выполненные и упавшие задачи старше срока хранения.
+
+    Удаление идёт пачками, чтобы не держать долгую блокировку таблицы.
+    """
+    days = settings.JOBS_RETENTION_DAYS if days is None else days
+    finished = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - timedelta(days=days)
+    ).order_by().values_list('id', flat=True)
+    deleted = 0
+    while True:
+        ids = list(finished[:PRUNE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,17 @@
+import json
+
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    def get_result(self, job):
+        return json.loads(job.result) if job.result else None
+
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'status', 'attempts', 'result', 'created',
+                  'finished')
@@ -0,0 +1,13 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from .views import JobViewSet
+
+app_name = 'jobs'
+
+router = DefaultRouter()
+router.register('jobs', JobViewSet, basename='jobs')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,28 @@
+from django.urls import reverse
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+def accepted(request, job):
+    url = request.build_absolute_uri(
+        reverse('jobs:jobs-detail', kwargs={'pk': job.pk})
+    )
+    return Response(
+        {'id': job.pk, 'status': job.status, 'status_url': url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url}
+    )
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
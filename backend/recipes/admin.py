@@ -1,6 +1,88 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, QuerySet
+from django.db.models.deletion import ProtectedError
 
-from .models import Ingredient, Recipe, Tag
+from . import deletion
+from .fast_serializers import rebuild_snapshots
+from .models import Favorite, Ingredient, IngredientInRecipe, Recipe, Tag
+from .paginations import EstimatedCountPaginator
+
+
+class IngredientInRecipeInline(admin.TabularInline):
+    model = IngredientInRecipe
+    autocomplete_fields = ('ingredient',)
+    min_num = 1
+    extra = 0
+
+
+DELETED_OBJECTS_SHOWN = 100
+
+
+class BulkDeleteMixin:
+    """Удаление подзапросами, без загрузки связанных объектов в память."""
+
+    bulk_delete = None
+
+    def get_deleted_objects(self, objs, request):
+        if not isinstance(objs, QuerySet):
+            objs = self.model._base_manager.filter(
+                pk__in=[obj.pk for obj in objs]
+            )
+        try:
+            counts = self.bulk_delete(objs, dry_run=True)
+        except ProtectedError as error:
+            return [], {}, set(), [
+                str(obj)
+                for obj in error.protected_objects[:DELETED_OBJECTS_SHOWN]
+            ]
+        perms_needed = {
+            str(model._meta.verbose_name)
+            for model in counts
+            if not request.user.has_perm(
+                f'{model._meta.app_label}.delete_{model._meta.model_name}'
+            )
+        }
+        return (
+            [str(obj) for obj in objs[:DELETED_OBJECTS_SHOWN]],
+            deletion.describe(counts),
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        self.bulk_delete(self.model._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.bulk_delete(queryset)
+
+
+class DuplicateFilter(admin.SimpleListFilter):
+    title = 'дубликат'
+    parameter_name = 'duplicate'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Да'), ('no', 'Нет'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(fingerprint__duplicate_of__isnull=False)
+        if self.value() == 'no':
+            return queryset.exclude(fingerprint__duplicate_of__isnull=False)
+        return queryset
+
+
+class RecipeChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        recipes = list(self.result_list)
+        counts = dict(
+            Favorite.objects.filter(
+                recipe__in=[recipe.id for recipe in recipes]
+            ).values_list('recipe').annotate(Count('id'))
+        )
+        for recipe in recipes:
+            recipe.favorites_count = counts.get(recipe.id, 0)
 
 
 @admin.register(Tag)
@@ -11,13 +93,35 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('^name',)
+    show_full_result_count = False
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BulkDeleteMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'favorites')
-    list_filter = ('name', 'author', 'tags')
+    list_filter = ('tags', DuplicateFilter)
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username', 'author__email')
+    autocomplete_fields = ('author',)
+    inlines = (IngredientInRecipeInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    bulk_delete = staticmethod(deletion.delete_recipes)
+
+    def get_changelist(self, request, **kwargs):
+        return RecipeChangeList
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.version += 1
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        rebuild_snapshots([form.instance.id])
 
     def favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    favorites.short_description = 'В избранном'
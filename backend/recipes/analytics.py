@@ -0,0 +1,220 @@
+import csv
+import gzip
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.db.models import Max
+
+from users.models import Subscription, User
+from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCart, Tag)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CSV = 'csv'
+PARQUET = 'parquet'
+MANIFEST = 'manifest.json'
+INTEGER_FIELDS = (
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'ForeignKey',
+    'IntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+    'SmallIntegerField',
+)
+
+TABLES = {
+    'users': (User, (
+        'id', 'username', 'first_name', 'last_name', 'date_joined',
+        'last_login', 'is_active', 'is_staff', 'followers_count'
+    )),
+    'subscriptions': (Subscription, ('id', 'user_id', 'author_id')),
+    'tags': (Tag, ('id', 'name', 'slug')),
+    'ingredients': (Ingredient, ('id', 'name', 'measurement_unit')),
+    'recipes': (Recipe, (
+        'id', 'author_id', 'name', 'text', 'cooking_time', 'image'
+    )),
+    'recipe_ingredients': (IngredientInRecipe, (
+        'id', 'recipe_id', 'ingredient_id', 'amount'
+    )),
+    'recipe_tags': (Recipe.tags.through, ('id', 'recipe_id', 'tag_id')),
+    'favorites': (Favorite, ('id', 'user_id', 'recipe_id', 'created')),
+    'shopping_cart': (ShoppingCart, (
+        'id', 'user_id', 'recipe_id', 'created'
+    )),
+}
+
+
+def id_range(name, using, since=None, until=None):
+    model, _ = TABLES[name]
+    last = model._base_manager.using(using).aggregate(
+        last=Max('id')
+    )['last'] or 0
+    return since or 0, last if until is None else min(until, last)
+
+
+def get_queryset(name, using, since, until):
+    model, columns = TABLES[name]
+    return model._base_manager.using(using).filter(
+        id__gt=since, id__lte=until
+    ).order_by('id').values_list(*columns)
+
+
+class RowCounter:
+    """Файл-обёртка, считающая записанные строки CSV.
+
+    Перевод строки внутри кавычек (многострочный текст рецепта) строку
+    не завершает; удвоенная кавычка переключает состояние дважды.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.quoted = False
+        self.lines = 0
+
+    def write(self, data):
+        self.output.write(data)
+        for index, part in enumerate(data.split(b'"')):
+            if index:
+                self.quoted = not self.quoted
+            if not self.quoted:
+                self.lines += part.count(b'\n')
+
+
+def copy_csv(queryset, path):
+    """COPY ... TO STDOUT прямо в gzip-файл, без строк в памяти Python.
+
+    rowcount у COPY TO зависит от версии драйвера и бывает -1, поэтому
+    строки считаются по выводу, без заголовка.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor, gzip.open(path, 'wb') as output:
+        select = cursor.cursor.mogrify(sql, params).decode()
+        counter = RowCounter(output)
+        cursor.cursor.copy_expert(
+            f'COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)', counter
+        )
+        return max(counter.lines - 1, 0)
+
+
+def batches(queryset, batch_size):
+    """Чанки строк по ключу id: память ограничена размером чанка."""
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(id__gt=last)
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def write_csv(queryset, columns, path, batch_size):
+    written = 0
+    with gzip.open(path, 'wb') as compressed:
+        with io.TextIOWrapper(
+            compressed, encoding='utf-8', newline=''
+        ) as output:
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            for rows in batches(queryset, batch_size):
+                writer.writerows(rows)
+                written += len(rows)
+    return written
+
+
+def arrow_type(field):
+    internal_type = field.get_internal_type()
+    if internal_type in INTEGER_FIELDS:
+        return pyarrow.int64()
+    if internal_type == 'BooleanField':
+        return pyarrow.bool_()
+    if internal_type == 'DateTimeField':
+        return pyarrow.timestamp('us', tz='UTC')
+    return pyarrow.string()
+
+
+def parquet_schema(model, columns):
+    return pyarrow.schema([
+        (column, arrow_type(model._meta.get_field(column)))
+        for column in columns
+    ])
+
+
+def write_parquet(queryset, columns, path, batch_size):
+    schema = parquet_schema(queryset.model, columns)
+    written = 0
+    with pyarrow.parquet.ParquetWriter(
+        path, schema, compression='zstd'
+    ) as writer:
+        for rows in batches(queryset, batch_size):
+            writer.write_table(pyarrow.Table.from_arrays(
+                [
+                    pyarrow.array(values, type=field.type)
+                    for values, field in zip(zip(*rows), schema)
+                ],
+                schema=schema
+            ))
+            written += len(rows)
+    return written
+
+
+def export_table(name, directory, output_format, using, since, until,
+                 batch_size):
+    try:
+        since, until = id_range(name, using, since, until)
+        extension = 'parquet' if output_format == PARQUET else 'csv.gz'
+        path = os.path.join(directory, f'{name}-{since}-{until}.{extension}')
+        _, columns = TABLES[name]
+        queryset = get_queryset(name, using, since, until)
+        if output_format == PARQUET:
+            rows = write_parquet(queryset, columns, path, batch_size)
+        elif connections[using].vendor == 'postgresql':
+            rows = copy_csv(queryset, path)
+        else:
+            rows = write_csv(queryset, columns, path, batch_size)
+        return name, {'file': os.path.basename(path), 'rows': rows,
+                      'since': since, 'until': until}
+    finally:
+        connections[using].close()
+
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest:
+        return json.load(manifest)
+
+
+def export(names, directory, output_format=CSV, using='default',
+           since=None, until=None, incremental=False, threads=4,
+           batch_size=10000):
+    """Выгружает таблицы параллельно, по потоку и соединению на таблицу.
+
+    В режиме incremental каждая таблица продолжается с until из прошлого
+    манифеста; обновления уже выгруженных строк не переносятся.
+    """
+    if output_format == PARQUET and pyarrow is None:
+        raise ImportError('Для Parquet нужен pyarrow.')
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    with ThreadPoolExecutor(threads) as executor:
+        results = executor.map(
+            lambda name: export_table(
+                name, directory, output_format, using,
+                manifest.get(name, {}).get('until') if incremental else since,
+                until, batch_size
+            ),
+            names
+        )
+        exported = dict(results)
+    manifest.update(exported)
+    with open(os.path.join(directory, MANIFEST), 'w') as output:
+        json.dump(manifest, output, indent=2)
+    return exported
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .fingerprints import get_policy
+        get_policy()
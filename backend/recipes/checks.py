@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_throttle_cache(app_configs, **kwargs):
+    """Лимиты частоты без общего кеша считаются в каждом процессе."""
+    if not settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_CLASSES'):
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'Кеш {backend} живёт в памяти процесса: лимиты частоты запросов '
+        'не действуют между воркерами.',
+        hint='Укажите общий кеш в CACHE_BACKEND и CACHE_LOCATION, '
+             'например memcached.',
+        id='recipes.E001',
+    )]
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import (CASCADE, DO_NOTHING, PROTECT, SET_NULL, Count,
+                              F, Q)
+from django.db.models.deletion import ProtectedError
+
+from jobs.queue import enqueue
+from users.models import Subscription, User
+from . import membership
+from .models import Change, Favorite, Recipe, ShoppingCart
+
+PROTECTED = 'Удаление запрещено связью {}.'
+UNSUPPORTED = (
+    'Пакетное удаление не поддерживает on_delete={} у поля {}.{}.'
+)
+MEMBERSHIP_KINDS = {
+    Favorite: Change.FAVORITE,
+    ShoppingCart: Change.SHOPPING_CART,
+}
+
+
+def plan(queryset):
+    """Зависимые строки queryset в порядке удаления: сначала листья.
+
+    Каждый шаг — (модель, условие, изменения); условие ссылается на
+    родителя подзапросом, поэтому строки в память не загружаются.
+    """
+    steps = []
+    for relation in queryset.model._meta.get_fields(include_hidden=True):
+        if not relation.auto_created or relation.concrete:
+            continue
+        if not (relation.one_to_many or relation.one_to_one):
+            continue
+        on_delete = relation.on_delete
+        if on_delete is DO_NOTHING:
+            continue
+        field = relation.field.name
+        condition = Q(**{f'{field}__in': queryset.values('pk')})
+        related = relation.related_model._base_manager.using(queryset.db)
+        if on_delete is CASCADE:
+            steps.extend(plan(related.filter(condition)))
+            steps.append((relation.related_model, condition, None))
+        elif on_delete is SET_NULL:
+            steps.append((relation.related_model, condition, {field: None}))
+        elif on_delete is PROTECT:
+            protected = related.filter(condition)
+            if protected.exists():
+                raise ProtectedError(PROTECTED.format(relation), protected)
+        else:
+            raise ImproperlyConfigured(UNSUPPORTED.format(
+                on_delete.__name__, relation.related_model._meta.label,
+                field
+            ))
+    return steps
+
+
+def count(queryset):
+    """Сколько строк каждой модели затронет удаление queryset."""
+    conditions = defaultdict(list)
+    for model, condition, _ in plan(queryset):
+        conditions[model].append(condition)
+    counts = {queryset.model: queryset.count()}
+    for model, model_conditions in conditions.items():
+        counts[model] = model._base_manager.using(queryset.db).filter(
+            reduce(or_, model_conditions)
+        ).count()
+    return counts
+
+
+def execute(queryset):
+    """Удаляет queryset по плану без сигналов.
+
+    Поэтому кэш членства владельцев удаляемых избранного, корзин и
+    подписок сбрасывается здесь.
+    """
+    for model, condition, changes in plan(queryset):
+        related = model._base_manager.using(queryset.db).filter(condition)
+        if changes is None:
+            membership.invalidate_rows(related)
+            related._raw_delete(related.db)
+        else:
+            related.update(**changes)
+    queryset._raw_delete(queryset.db)
+
+
+def chunks(queryset):
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        ids = list(queryset[:settings.DELETE_BATCH_SIZE])
+        if not ids:
+            return
+        yield ids
+
+
+def bulk_create(model, objects):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, settings.DELETE_BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def record_deletions(kind, rows):
+    """Пишет удаления в журнал после фиксации транзакции.
+
+    Как и signals.record: id изменений растут в порядке фиксации.
+    """
+    rows = list(rows)
+    if rows:
+        transaction.on_commit(lambda: bulk_create(Change, (
+            Change(user_id=user_id, kind=kind, object_id=object_id,
+                   operation=Change.DELETE)
+            for user_id, object_id in rows
+        )))
+
+
+def delete_recipes(queryset, dry_run=False):
+    """Удаляет рецепты пачками.
+
+    Владельцам избранного и корзин пишутся удаления для синхронизации.
+    """
+    if dry_run:
+        return count(queryset)
+    deleted = 0
+    for ids in chunks(queryset):
+        chunk = Recipe._base_manager.filter(pk__in=ids)
+        with transaction.atomic():
+            images = [name for name in chunk.values_list(
+                'image', flat=True
+            ) if name]
+            for model, kind in MEMBERSHIP_KINDS.items():
+                record_deletions(kind, model.objects.filter(
+                    recipe_id__in=ids
+                ).values_list('user_id', 'recipe_id').iterator())
+            execute(chunk)
+            record_deletions(Change.RECIPE, ((None, pk) for pk in ids))
+            if images:
+                transaction.on_commit(lambda images=images: enqueue(
+                    'recipes.delete_images', priority=-1, names=images
+                ))
+        deleted += len(ids)
+    return {Recipe: deleted}
+
+
+def delete_users(queryset, dry_run=False):
+    """Удаляет пользователей вместе с рецептами пачками.
+
+    Рецепты удаляются отдельными транзакциями, картинки чистит задача,
+    подписчикам пишутся удаления подписок для синхронизации.
+    """
+    if dry_run:
+        return count(queryset)
+    deleted = 0
+    for ids in chunks(queryset):
+        delete_recipes(Recipe.objects.filter(author_id__in=ids))
+        with transaction.atomic():
+            decrements = defaultdict(list)
+            for author_id, removed in Subscription.objects.filter(
+                user_id__in=ids
+            ).exclude(author_id__in=ids).values_list('author_id').annotate(
+                Count('id')
+            ).order_by():
+                decrements[removed].append(author_id)
+            record_deletions(Change.SUBSCRIPTION, Subscription.objects.filter(
+                author_id__in=ids
+            ).exclude(user_id__in=ids).values_list(
+                'user_id', 'author_id'
+            ).iterator())
+            execute(User._base_manager.filter(pk__in=ids))
+            for removed, author_ids in decrements.items():
+                User.objects.filter(id__in=author_ids).update(
+                    followers_count=F('followers_count') - removed
+                )
+                refill_feeds(author_ids, removed)
+        deleted += len(ids)
+    return {User: deleted}
+
+
+def refill_feeds(author_ids, removed):
+    """Ставит раскладку лент авторам, опустившимся ниже порога."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    for author_id in User.objects.filter(
+        id__in=author_ids, followers_count__lt=limit,
+        followers_count__gte=limit - removed
+    ).values_list('id', flat=True):
+        transaction.on_commit(lambda author_id=author_id: enqueue(
+            'recipes.fan_out_author', author_id=author_id
+        ))
+
+
+def describe(counts):
+    return {
+        str(model._meta.verbose_name_plural): number
+        for model, number in counts.items() if number
+    }
@@ -0,0 +1,309 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from users.models import User
+from .fieldsets import parse_fields
+from .membership import (FAVORITES, SHOPPING_CART, SUBSCRIPTIONS,
+                         get_membership)
+from .models import IngredientInRecipe, Recipe, RecipeSnapshot
+
+RECIPE_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+)
+EXPANDABLE_FIELDS = ('tags', 'author', 'ingredients')
+CARD_VIEW = 'card'
+CARD_FIELDS = (
+    'id', 'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+    'name', 'image', 'cooking_time'
+)
+FIELD_COLUMNS = {
+    'author': 'author_id',
+    'name': 'name',
+    'image': 'image',
+    'text': 'text',
+    'cooking_time': 'cooking_time',
+}
+RECIPE_COLUMNS = ('id', 'author_id', 'name', 'image', 'text', 'cooking_time')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def get_fieldset(request):
+    """Поля и раскрываемые вложенные объекты запроса.
+
+    Без ?expand= вложенные объекты раскрываются, как в RecipeSerializer;
+    идентификаторы вместо них отдаются только по явному ?expand=.
+    """
+    if request.query_params.get('view') == CARD_VIEW:
+        return CARD_FIELDS, {'tags', 'author'}
+    fields = parse_fields(request, 'fields', RECIPE_FIELDS)
+    if fields is None:
+        fields = RECIPE_FIELDS
+    expand = parse_fields(request, 'expand', EXPANDABLE_FIELDS)
+    return fields, set(EXPANDABLE_FIELDS if expand is None else expand)
+
+
+def use_snapshots(fields, expand):
+    """Снимки читаются, только если нужны раскрытые вложенные объекты.
+
+    Иначе дешевле выбрать из рецептов лишь запрошенные колонки.
+    """
+    return settings.RECIPE_SNAPSHOTS and not set(fields).isdisjoint(expand)
+
+
+def get_columns(fields, expand=EXPANDABLE_FIELDS):
+    if use_snapshots(fields, expand):
+        return ('id',)
+    return ('id',) + tuple(
+        column for field, column in FIELD_COLUMNS.items() if field in fields
+    )
+
+
+def image_url(request, name):
+    if not name:
+        return None
+    url = default_storage.url(str(name))
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_tags(recipe_ids, expand=True):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+    if not expand:
+        for recipe_id, pk in rows.order_by('tag_id').values_list(
+            'recipe_id', 'tag_id'
+        ):
+            tags[recipe_id].append(pk)
+        return tags
+    for recipe_id, pk, name, color, slug in rows.order_by(
+        'tag__name'
+    ).values_list(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[recipe_id].append(
+            {'id': pk, 'name': name, 'color': color, 'slug': slug}
+        )
+    return tags
+
+
+def get_ingredients(recipe_ids, expand=True):
+    ingredients = defaultdict(list)
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id')
+    if not expand:
+        for recipe_id, pk, amount in rows.values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        ):
+            ingredients[recipe_id].append({'id': pk, 'amount': amount})
+        return ingredients
+    for recipe_id, pk, name, measurement_unit, amount in rows.values_list(
+        'recipe_id', 'ingredient__id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[recipe_id].append({
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def get_authors(author_ids, membership):
+    authors = {}
+    for author in User.objects.filter(id__in=author_ids).values(
+        *AUTHOR_FIELDS
+    ):
+        author['is_subscribed'] = membership.contains(
+            SUBSCRIPTIONS, author['id']
+        )
+        authors[author['id']] = author
+    return authors
+
+
+def serialize_recipes(rows, request, fields=RECIPE_FIELDS,
+                      expand=EXPANDABLE_FIELDS):
+    """Сериализует строки get_columns(fields, expand) так же, как
+    RecipeSerializer.
+
+    Вложенные поля не из expand отдаются идентификаторами.
+    """
+    rows = list(rows)
+    if use_snapshots(fields, expand):
+        recipe_ids = [row['id'] for row in rows]
+        return serialize_documents(
+            recipe_ids, get_documents(recipe_ids), request, fields, expand
+        )
+    recipe_ids = [row['id'] for row in rows]
+    membership = get_membership(request)
+    getters = {
+        'id': lambda row: row['id'],
+        'is_favorited': lambda row: membership.contains(
+            FAVORITES, row['id']
+        ),
+        'is_in_shopping_cart': lambda row: membership.contains(
+            SHOPPING_CART, row['id']
+        ),
+        'name': lambda row: row['name'],
+        'image': lambda row: image_url(request, row['image']),
+        'text': lambda row: row['text'],
+        'cooking_time': lambda row: row['cooking_time'],
+        'author': lambda row: row['author_id'],
+    }
+    if 'tags' in fields:
+        tags = get_tags(recipe_ids, 'tags' in expand)
+        getters['tags'] = lambda row: tags[row['id']]
+    if 'ingredients' in fields:
+        ingredients = get_ingredients(recipe_ids, 'ingredients' in expand)
+        getters['ingredients'] = lambda row: ingredients[row['id']]
+    if 'author' in fields and 'author' in expand:
+        authors = get_authors(
+            {row['author_id'] for row in rows}, membership
+        )
+        getters['author'] = lambda row: authors[row['author_id']]
+    getters = [(field, getters[field]) for field in fields]
+    return [{field: get(row) for field, get in getters} for row in rows]
+
+
+def build_documents(recipe_ids):
+    """Публичная часть рецептов, не зависящая от пользователя."""
+    rows = list(
+        Recipe.objects.filter(id__in=recipe_ids).values(*RECIPE_COLUMNS)
+    )
+    tags = get_tags(recipe_ids)
+    ingredients = get_ingredients(recipe_ids)
+    authors = {
+        author['id']: author
+        for author in User.objects.filter(
+            id__in={row['author_id'] for row in rows}
+        ).values(*AUTHOR_FIELDS)
+    }
+    return {
+        row['id']: {
+            'tags': tags[row['id']],
+            'author': authors[row['author_id']],
+            'ingredients': ingredients[row['id']],
+            'name': row['name'],
+            'image': str(row['image']),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    }
+
+
+def store_documents(documents, replace=True):
+    snapshots = [
+        RecipeSnapshot(
+            recipe_id=pk, data=json.dumps(document, ensure_ascii=False)
+        )
+        for pk, document in documents.items()
+    ]
+    if not replace:
+        RecipeSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        return
+    with transaction.atomic():
+        RecipeSnapshot.objects.filter(recipe_id__in=list(documents)).delete()
+        RecipeSnapshot.objects.bulk_create(snapshots)
+
+
+def rebuild_snapshots(recipe_ids):
+    documents = build_documents(recipe_ids)
+    store_documents(documents)
+    RecipeSnapshot.objects.filter(recipe_id__in=recipe_ids).exclude(
+        recipe_id__in=list(documents)
+    ).delete()
+    return documents
+
+
+def backfill_snapshots(batch_size=500):
+    """Собирает снимки рецептов, у которых их нет."""
+    built = 0
+    while True:
+        recipe_ids = list(
+            Recipe.objects.filter(snapshot__isnull=True).order_by(
+                'id'
+            ).values_list('id', flat=True)[:batch_size]
+        )
+        if not recipe_ids:
+            return built
+        store_documents(build_documents(recipe_ids), replace=False)
+        built += len(recipe_ids)
+
+
+def read_documents(recipe_ids):
+    """Читает сохранённые снимки, ничего не собирая."""
+    return {
+        pk: json.loads(data)
+        for pk, data in RecipeSnapshot.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'data')
+    }
+
+
+def get_documents(recipe_ids):
+    """Читает снимки; недостающие собирает и сохраняет."""
+    documents = read_documents(recipe_ids)
+    missing = [pk for pk in recipe_ids if pk not in documents]
+    if missing:
+        built = build_documents(missing)
+        store_documents(built, replace=False)
+        documents.update(built)
+    return documents
+
+
+def serialize_documents(recipe_ids, documents, request, fields, expand):
+    membership = get_membership(request)
+    result = []
+    for pk in recipe_ids:
+        document = documents.get(pk)
+        if document is None:
+            continue
+        author = document['author']
+        values = {
+            'id': pk,
+            'tags': document['tags'],
+            'author': {
+                **author,
+                'is_subscribed': membership.contains(
+                    SUBSCRIPTIONS, author['id']
+                ),
+            },
+            'ingredients': document['ingredients'],
+            'is_favorited': membership.contains(FAVORITES, pk),
+            'is_in_shopping_cart': membership.contains(SHOPPING_CART, pk),
+            'name': document['name'],
+            'image': image_url(request, document['image']),
+            'text': document['text'],
+            'cooking_time': document['cooking_time'],
+        }
+        if 'tags' not in expand:
+            values['tags'] = sorted(tag['id'] for tag in document['tags'])
+        if 'author' not in expand:
+            values['author'] = author['id']
+        if 'ingredients' not in expand:
+            values['ingredients'] = [
+                {'id': item['id'], 'amount': item['amount']}
+                for item in document['ingredients']
+            ]
+        result.append({field: values[field] for field in fields})
+    return result
+
+
+def serialize_ids(request, ids):
+    """Сериализует рецепты в порядке ids, пропуская удалённые."""
+    fields, expand = get_fieldset(request)
+    rows = Recipe.objects.filter(id__in=ids).values(
+        *get_columns(fields, expand)
+    )
+    rows = {row['id']: row for row in rows}
+    return serialize_recipes(
+        [rows[pk] for pk in ids if pk in rows], request, fields, expand
+    )
@@ -0,0 +1,24 @@
+from rest_framework.exceptions import ValidationError
+
+UNKNOWN_FIELDS = 'Неизвестные поля: {}.'
+
+
+def parse_fields(request, param, available):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = fields - set(available)
+    if unknown:
+        raise ValidationError(
+            {param: UNKNOWN_FIELDS.format(', '.join(sorted(unknown)))}
+        )
+    return tuple(field for field in available if field in fields)
+
+
+class SparseFieldsMixin:
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -1,11 +1,31 @@
 from enum import Enum
 
+from django import forms
+from django.conf import settings
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, When
 from django_filters import rest_framework as fl
-from django_filters.filters import (AllValuesMultipleFilter, ModelChoiceFilter,
+from django_filters.filters import (AllValuesMultipleFilter, BaseInFilter,
+                                    ChoiceFilter, ModelChoiceFilter,
                                     NumberFilter)
+from rest_framework.serializers import ValidationError
 
 from users.models import User
-from .models import Recipe
+from .membership import FAVORITES, SHOPPING_CART, get_membership
+from .models import IngredientInRecipe, Recipe
+
+
+TOO_MANY_IDS = 'Можно запросить не больше {} рецептов за раз.'
+TOO_MANY_INGREDIENTS = 'Можно указать не больше {} ингредиентов.'
+
+
+ORDERINGS = {
+    'popular': 'stats__popular',
+    'trending': 'stats__trending',
+}
+
+
+class NumberInFilter(BaseInFilter, NumberFilter):
+    field_class = forms.IntegerField
 
 
 class IsInFavorites(Enum):
@@ -19,23 +39,102 @@ class IsInShoppingCart(Enum):
 
 
 class RecipeFilter(fl.FilterSet):
+    ids = NumberInFilter(method='get_ids')
     author = ModelChoiceFilter(queryset=User.objects.all())
     tags = AllValuesMultipleFilter(field_name='tags__slug')
     is_favorited = NumberFilter(method='get_is_favorited')
     is_in_shopping_cart = NumberFilter(method='get_is_in_shopping_cart')
+    min_cooking_time = NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    max_cooking_time = NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    ingredients = NumberInFilter(method='get_ingredients')
+    exclude_ingredients = NumberInFilter(method='get_exclude_ingredients')
+    ordering = ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS], method='get_ordering'
+    )
+
+    def filter_by_membership(self, queryset, kind, lookup):
+        membership = get_membership(self.request)
+        if membership.count(kind) <= settings.MEMBERSHIP_FILTER_LIMIT:
+            return queryset.filter(id__in=list(membership.get(kind)))
+        return queryset.filter(**{lookup: self.request.user})
+
+    def get_ids(self, queryset, name, value):
+        if len(value) > settings.RECIPE_IDS_LIMIT:
+            raise ValidationError(
+                {name: TOO_MANY_IDS.format(settings.RECIPE_IDS_LIMIT)}
+            )
+        queryset = queryset.filter(id__in=value)
+        if not value:
+            return queryset
+        return queryset.order_by(Case(
+            *(When(id=pk, then=position) for position, pk in enumerate(value)),
+            output_field=IntegerField()
+        ))
+
+    def check_ingredients(self, name, value):
+        limit = settings.RECIPE_INGREDIENTS_FILTER_LIMIT
+        if len(value) > limit:
+            raise ValidationError({name: TOO_MANY_INGREDIENTS.format(limit)})
+
+    def get_ingredients(self, queryset, name, value):
+        """Рецепты со всеми ингредиентами: по EXISTS на каждый.
+
+        Подзапросы идут по составным индексам IngredientInRecipe и, в
+        отличие от JOIN, не размножают строки рецептов.
+        """
+        self.check_ingredients(name, value)
+        for pk in sorted(set(value)):
+            queryset = queryset.annotate(**{
+                f'has_ingredient_{pk}': Exists(
+                    IngredientInRecipe.objects.filter(
+                        recipe_id=OuterRef('pk'), ingredient_id=pk
+                    )
+                )
+            }).filter(**{f'has_ingredient_{pk}': True})
+        return queryset
+
+    def get_exclude_ingredients(self, queryset, name, value):
+        self.check_ingredients(name, value)
+        return queryset.annotate(has_excluded_ingredient=Exists(
+            IngredientInRecipe.objects.filter(
+                recipe_id=OuterRef('pk'), ingredient_id__in=set(value)
+            )
+        )).filter(has_excluded_ingredient=False)
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value == IsInFavorites.IN.value and user.is_authenticated:
-            return queryset.filter(favorites__user=user)
+            return self.filter_by_membership(
+                queryset, FAVORITES, 'favorites__user'
+            )
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value == IsInShoppingCart.IN.value and user.is_authenticated:
-            return queryset.filter(shopping_cart__user=user)
+            return self.filter_by_membership(
+                queryset, SHOPPING_CART, 'shopping_cart__user'
+            )
         return queryset
 
+    def get_ordering(self, queryset, name, value):
+        """Порядок по индексу статистики через внутреннее соединение.
+
+        Строка статистики есть у каждого рецепта: её создаёт сигнал, а
+        недостающие дописывает refresh_stats.
+        """
+        return queryset.filter(stats__isnull=False).order_by(
+            F(ORDERINGS[value]).desc(), F('stats__recipe_id').desc()
+        )
+
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'ids', 'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+            'min_cooking_time', 'max_cooking_time', 'ingredients',
+            'exclude_ingredients', 'ordering'
+        )
@@ -0,0 +1,259 @@
+import hashlib
+import re
+import zlib
+from collections import defaultdict, namedtuple
+from itertools import combinations, groupby
+from multiprocessing import Pool
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count
+
+from .models import (IngredientInRecipe, Recipe, RecipeFingerprint,
+                     RecipeFingerprintBand)
+
+PERMUTATIONS = 64
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+PRIME = (1 << 31) - 1
+SHINGLE_SIZE = 3
+CANDIDATES_LIMIT = 50
+BUCKET_LIMIT = 100
+
+REJECT = 'reject'
+FLAG = 'flag'
+OFF = 'off'
+POLICIES = (REJECT, FLAG, OFF)
+UNKNOWN_POLICY = 'DUPLICATE_RECIPE_POLICY должна быть одной из: {}.'
+
+WORDS = re.compile(r'\w+')
+
+_random = np.random.RandomState(20220425)
+COEFFICIENTS = _random.randint(
+    1, PRIME, size=(PERMUTATIONS, 1)
+).astype(np.uint64)
+OFFSETS = _random.randint(0, PRIME, size=(PERMUTATIONS, 1)).astype(np.uint64)
+
+Fingerprint = namedtuple('Fingerprint', ('exact', 'signature', 'keys'))
+
+
+def normalize(text):
+    return WORDS.findall(text.lower())
+
+
+def shingles(name, text, ingredients):
+    yield 'n' + ' '.join(normalize(name))
+    for pk, _ in ingredients:
+        yield f'i{pk}'
+    words = normalize(text)
+    for start in range(max(len(words) - SHINGLE_SIZE + 1, 1)):
+        yield 't' + ' '.join(words[start:start + SHINGLE_SIZE])
+
+
+def minhash(values):
+    hashes = np.fromiter(
+        (zlib.crc32(value.encode()) for value in set(values)),
+        dtype=np.uint64
+    )
+    return (
+        (COEFFICIENTS * hashes + OFFSETS) % PRIME
+    ).min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature):
+    """Ключи LSH: хеш каждой полосы из ROWS значений подписи."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                bytes([band]) + signature[band * ROWS:(band + 1) * ROWS]
+                .tobytes(),
+                digest_size=8
+            ).digest(),
+            'big', signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def build(name, text, ingredients):
+    """Отпечаток рецепта по названию, описанию и парам (id, количество)."""
+    ingredients = sorted(
+        (int(pk), int(amount)) for pk, amount in ingredients
+    )
+    exact = hashlib.sha1(
+        '{}|{}'.format(' '.join(normalize(name)), ingredients).encode()
+    ).hexdigest()
+    signature = minhash(shingles(name, text, ingredients))
+    return Fingerprint(exact, signature, band_keys(signature))
+
+
+def get_policy():
+    policy = settings.DUPLICATE_RECIPE_POLICY
+    if policy not in POLICIES:
+        raise ImproperlyConfigured(UNKNOWN_POLICY.format(', '.join(POLICIES)))
+    return policy
+
+
+def load_signature(data):
+    return np.frombuffer(data, dtype=np.uint32)
+
+
+def find_duplicate(fingerprint, exclude=None):
+    """Id точной или почти точной копии; поиск только по индексам."""
+    fingerprints = RecipeFingerprint.objects.order_by('recipe_id')
+    if exclude is not None:
+        fingerprints = fingerprints.exclude(recipe_id=exclude)
+    exact = fingerprints.filter(exact=fingerprint.exact).values_list(
+        'recipe_id', flat=True
+    ).first()
+    if exact is not None:
+        return exact
+    bands = RecipeFingerprintBand.objects.filter(key__in=fingerprint.keys)
+    if exclude is not None:
+        bands = bands.exclude(recipe_id=exclude)
+    candidates = fingerprints.filter(recipe_id__in=list(
+        bands.values('recipe_id').annotate(bands=Count('id')).order_by(
+            '-bands'
+        ).values_list('recipe_id', flat=True)[:CANDIDATES_LIMIT]
+    )).values_list('recipe_id', 'signature')
+    score, duplicate = max(
+        (
+            (np.mean(load_signature(signature) == fingerprint.signature), pk)
+            for pk, signature in candidates
+        ),
+        default=(0, None)
+    )
+    if score >= settings.DUPLICATE_SIMILARITY_THRESHOLD:
+        return duplicate
+    return None
+
+
+def store(items):
+    """Сохраняет отпечатки: items — (recipe_id, отпечаток, дубликат)."""
+    recipe_ids = [recipe_id for recipe_id, _, _ in items]
+    with transaction.atomic():
+        RecipeFingerprint.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeFingerprintBand.objects.filter(
+            recipe_id__in=recipe_ids
+        ).delete()
+        RecipeFingerprint.objects.bulk_create(
+            RecipeFingerprint(
+                recipe_id=recipe_id,
+                exact=fingerprint.exact,
+                signature=fingerprint.signature.tobytes(),
+                duplicate_of_id=duplicate,
+            )
+            for recipe_id, fingerprint, duplicate in items
+        )
+        RecipeFingerprintBand.objects.bulk_create(
+            RecipeFingerprintBand(recipe_id=recipe_id, key=key)
+            for recipe_id, fingerprint, _ in items
+            for key in fingerprint.keys
+        )
+
+
+def load_sources(recipe_ids):
+    ingredients = defaultdict(list)
+    for recipe_id, pk, amount in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount'):
+        ingredients[recipe_id].append((pk, amount))
+    return [
+        (pk, name, text, ingredients[pk])
+        for pk, name, text in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', 'name', 'text')
+    ]
+
+
+def compute(source):
+    pk, name, text, ingredients = source
+    return pk, build(name, text, ingredients)
+
+
+def fingerprint_catalog(processes=None, batch_size=1000, rebuild=False):
+    """Строит недостающие отпечатки; подписи считаются в пуле процессов."""
+    queryset = Recipe.objects.order_by('id')
+    if not rebuild:
+        queryset = queryset.filter(fingerprint__isnull=True)
+    recipe_ids = list(queryset.values_list('id', flat=True))
+    built = 0
+    with Pool(processes) as pool:
+        for start in range(0, len(recipe_ids), batch_size):
+            sources = load_sources(recipe_ids[start:start + batch_size])
+            store([
+                (pk, fingerprint, None)
+                for pk, fingerprint in pool.map(compute, sources)
+            ])
+            built += len(sources)
+    return built
+
+
+def scan():
+    """Все пары (дубликат, оригинал, сходство) в каталоге.
+
+    Точные копии находятся группировкой по хешу, почти точные — по
+    совпадающим ключам LSH с проверкой сходства подписей.
+    """
+    found = {}
+    exact_groups = RecipeFingerprint.objects.values('exact').annotate(
+        copies=Count('recipe')
+    ).filter(copies__gt=1).values('exact')
+    for _, group in groupby(
+        RecipeFingerprint.objects.filter(exact__in=exact_groups).order_by(
+            'exact', 'recipe_id'
+        ).values_list('exact', 'recipe_id').iterator(),
+        key=lambda row: row[0]
+    ):
+        original, *copies = [recipe_id for _, recipe_id in group]
+        for copy in copies:
+            found[copy] = (original, 1.0)
+    collisions = RecipeFingerprintBand.objects.values('key').annotate(
+        copies=Count('id')
+    ).filter(copies__gt=1).values('key')
+    pairs = set()
+    for _, bucket in groupby(
+        RecipeFingerprintBand.objects.filter(key__in=collisions).order_by(
+            'key', 'recipe_id'
+        ).values_list('key', 'recipe_id').iterator(),
+        key=lambda row: row[0]
+    ):
+        recipe_ids = sorted({recipe_id for _, recipe_id in bucket})
+        pairs.update(combinations(recipe_ids[:BUCKET_LIMIT], 2))
+    pairs = [pair for pair in pairs if pair[1] not in found]
+    if pairs:
+        recipe_ids = sorted({pk for pair in pairs for pk in pair})
+        signatures = dict(
+            RecipeFingerprint.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list('recipe_id', 'signature')
+        )
+        matrix = np.stack(
+            [load_signature(signatures[pk]) for pk in recipe_ids]
+        )
+        pairs = np.array(pairs)
+        rows = np.searchsorted(recipe_ids, pairs)
+        scores = (matrix[rows[:, 0]] == matrix[rows[:, 1]]).mean(axis=1)
+        threshold = settings.DUPLICATE_SIMILARITY_THRESHOLD
+        for (original, copy), score in zip(pairs.tolist(), scores):
+            if score >= threshold and (
+                copy not in found or original < found[copy][0]
+            ):
+                found[copy] = (original, float(score))
+    return sorted(
+        (copy, original, score) for copy, (original, score) in found.items()
+    )
+
+
+def flag(duplicates):
+    copies = defaultdict(list)
+    for copy, original, _ in duplicates:
+        copies[original].append(copy)
+    with transaction.atomic():
+        RecipeFingerprint.objects.update(duplicate_of=None)
+        for original, recipe_ids in copies.items():
+            RecipeFingerprint.objects.filter(
+                recipe_id__in=recipe_ids
+            ).update(duplicate_of_id=original)
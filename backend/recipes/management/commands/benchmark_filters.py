@@ -0,0 +1,193 @@
+import random
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from recipes import deletion
+from recipes.filters import RecipeFilter
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import User
+
+BENCHMARK_IMAGE = 'recipe_images/benchmark.png'
+CONFIRM = (
+    'Каталог в базе "{}" будет дополнен синтетическими рецептами до {}; '
+    'после замеров они будут удалены. Введите "yes" для продолжения: '
+)
+CANCELLED = 'Отменено.'
+
+FULL_SCANS = {
+    'postgresql': ('Seq Scan on recipes_',),
+    'sqlite': (
+        'SCAN TABLE recipes_ingredientinrecipe',
+        'SCAN recipes_ingredientinrecipe',
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы и время запросов RecipeFilter по времени '
+        'приготовления и ингредиентам. С --populate дополняет каталог '
+        'синтетическими рецептами, например до 1 000 000, и удаляет их '
+        'после замеров, если не передан --keep.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--populate', type=int, default=0)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять синтетические рецепты после замеров.'
+        )
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Не спрашивать подтверждения.'
+        )
+        parser.add_argument('--batch', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE, только PostgreSQL.'
+        )
+
+    def populate(self, using, total, batch_size):
+        ingredient_ids = list(
+            Ingredient.objects.using(using).values_list('id', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты.')
+        author = User.objects.using(using).order_by('id').first()
+        if author is None:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        created = Recipe.objects.using(using).count()
+        while created < total:
+            size = min(batch_size, total - created)
+            with transaction.atomic(using=using):
+                recipes = Recipe.objects.using(using).bulk_create(
+                    Recipe(
+                        author=author, name=f'Рецепт {created + number}',
+                        text='Синтетический рецепт для замеров.',
+                        image=BENCHMARK_IMAGE,
+                        cooking_time=random.randint(1, 180),
+                    )
+                    for number in range(size)
+                )
+                if recipes[0].pk is None:
+                    last = Recipe.objects.using(using).order_by('-id')[:size]
+                    recipes = list(last.values_list('id', flat=True))
+                else:
+                    recipes = [recipe.pk for recipe in recipes]
+                IngredientInRecipe.objects.using(using).bulk_create(
+                    IngredientInRecipe(
+                        recipe_id=recipe_id, ingredient_id=ingredient_id,
+                        amount=random.randint(1, 500)
+                    )
+                    for recipe_id in recipes
+                    for ingredient_id in random.sample(
+                        ingredient_ids, min(len(ingredient_ids), 8)
+                    )
+                )
+            created += size
+            self.stdout.write(f'Рецептов: {created}')
+
+    def cleanup(self, using, start):
+        """Удаляет синтетические рецепты, добавленные после start.
+
+        Сигналы для них не срабатывали, поэтому и журнал изменений при
+        удалении не пишется.
+        """
+        removed = 0
+        for ids in deletion.chunks(Recipe._base_manager.using(using).filter(
+            id__gt=start, image=BENCHMARK_IMAGE
+        )):
+            with transaction.atomic(using=using):
+                deletion.execute(
+                    Recipe._base_manager.using(using).filter(pk__in=ids)
+                )
+            removed += len(ids)
+        self.stdout.write(f'Синтетических рецептов удалено: {removed}')
+
+    def get_cases(self, using):
+        common = list(
+            IngredientInRecipe.objects.using(using).values(
+                'ingredient_id'
+            ).annotate(
+                recipes=Count('id')
+            ).order_by('-recipes').values_list('ingredient_id', flat=True)[:3]
+        )
+        if not common:
+            raise CommandError('В каталоге нет рецептов с ингредиентами.')
+        first, others = str(common[0]), [str(pk) for pk in common[1:]]
+        return {
+            'max_cooking_time': {'max_cooking_time': '30'},
+            'cooking_time_range': {
+                'min_cooking_time': '20', 'max_cooking_time': '40'
+            },
+            'ingredients': {'ingredients': ','.join([first, *others])},
+            'exclude_ingredients': {'exclude_ingredients': first},
+            'combined': {
+                'max_cooking_time': '30', 'ingredients': first,
+                'exclude_ingredients': ','.join(others) or first,
+            },
+        }
+
+    def get_queryset(self, using, params, limit):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        request = Request(RequestFactory().get('/api/recipes/', query))
+        request.user = AnonymousUser()
+        filterset = RecipeFilter(
+            query, queryset=Recipe.objects.using(using), request=request
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors)
+        return filterset.qs.values_list('id', flat=True)[:limit]
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        explain = {'analyze': True} if options['analyze'] else {}
+        if explain and connection.vendor != 'postgresql':
+            raise CommandError('--analyze работает только на PostgreSQL.')
+        if not options['populate']:
+            self.benchmark(using, explain, options)
+            return
+        if options['interactive'] and input(CONFIRM.format(
+            connection.settings_dict['NAME'], options['populate']
+        )) != 'yes':
+            raise CommandError(CANCELLED)
+        start = Recipe.objects.using(using).order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+        try:
+            self.populate(using, options['populate'], options['batch'])
+            self.benchmark(using, explain, options)
+        finally:
+            if not options['keep']:
+                self.cleanup(using, start)
+
+    def benchmark(self, using, explain, options):
+        full_scans = FULL_SCANS.get(connections[using].vendor, ())
+        for name, params in self.get_cases(using).items():
+            queryset = self.get_queryset(using, params, options['limit'])
+            plan = queryset.explain(**explain)
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset)
+            elapsed = (time.perf_counter() - start) / options['repeat']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {params}, {elapsed * 1000:.2f} мс'
+            ))
+            self.stdout.write(plan)
+            if any(
+                scan in line and 'USING' not in line
+                for line in plan.splitlines() for scan in full_scans
+            ):
+                self.stdout.write(self.style.WARNING('Полный просмотр!'))
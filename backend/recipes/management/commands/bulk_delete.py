@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from recipes import deletion
+from recipes.models import Recipe
+from users.models import User
+
+TARGETS = {
+    'users': (User, deletion.delete_users),
+    'recipes': (Recipe, deletion.delete_recipes),
+}
+
+
+class Command(BaseCommand):
+    help = 'Удаляет пользователей или рецепты вместе со связанными данными.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=TARGETS)
+        parser.add_argument('ids', nargs='+', type=int)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать затрагиваемые объекты.'
+        )
+
+    def handle(self, *args, **options):
+        model, delete = TARGETS[options['target']]
+        counts = delete(
+            model.objects.filter(pk__in=options['ids']),
+            dry_run=options['dry_run']
+        )
+        for name, number in deletion.describe(counts).items():
+            self.stdout.write(f'{name}: {number}')
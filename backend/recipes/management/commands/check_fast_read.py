@@ -0,0 +1,45 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipes.fast_serializers import RECIPE_COLUMNS, serialize_recipes
+from recipes.models import Recipe
+from recipes.renderers import FastJSONRenderer
+from recipes.serializers import RecipeSerializer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Сверяет быстрый путь чтения рецептов с RecipeSerializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='user id', type=int)
+        parser.add_argument('--batch', type=int, default=100)
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        if options['user']:
+            request.user = User.objects.get(id=options['user'])
+        batch = options['batch']
+        recipes = Recipe.objects.all()
+        mismatches = 0
+        for start in range(0, recipes.count(), batch):
+            instances = list(recipes[start:start + batch])
+            expected = RecipeSerializer(
+                instances, many=True, context={'request': request}
+            ).data
+            actual = serialize_recipes(
+                recipes[start:start + batch].values(*RECIPE_COLUMNS), request
+            )
+            for old, new in zip(expected, actual):
+                if JSONRenderer().render(old) != FastJSONRenderer().render(
+                    new
+                ):
+                    mismatches += 1
+                    self.stderr.write(f'Рецепт id={old["id"]} отличается.')
+        if mismatches:
+            raise CommandError(f'Расхождений: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
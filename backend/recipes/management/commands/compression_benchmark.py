@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from foodgram.compression import BROTLI, GZIP, brotli, compress
+from recipes.fast_serializers import (RECIPE_COLUMNS, RECIPE_FIELDS,
+                                      serialize_recipes)
+from recipes.models import Recipe
+from recipes.renderers import FastJSONRenderer
+
+LEVELS = {GZIP: range(1, 10), BROTLI: range(0, 12)}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает степень и скорость сжатия по уровням.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='file path', type=str)
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def get_payload(self, options):
+        if options['path']:
+            with open(options['path'], 'rb') as f:
+                return f.read()
+        request = Request(RequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        rows = Recipe.objects.values(*RECIPE_COLUMNS)[:options['recipes']]
+        return FastJSONRenderer().render(
+            serialize_recipes(rows, request, RECIPE_FIELDS)
+        )
+
+    def handle(self, *args, **options):
+        payload = self.get_payload(options)
+        self.stdout.write(f'Размер исходных данных: {len(payload)} байт')
+        encodings = [GZIP] if brotli is None else [GZIP, BROTLI]
+        for encoding in encodings:
+            for level in LEVELS[encoding]:
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    compressed = compress(payload, encoding, level)
+                elapsed = (time.perf_counter() - start) / options['repeat']
+                self.stdout.write(
+                    f'{encoding:>4} {level:>2}: '
+                    f'{len(compressed):>9} байт, '
+                    f'x{len(payload) / len(compressed):.2f}, '
+                    f'{elapsed * 1000:.2f} мс, '
+                    f'{len(payload) / elapsed / 2 ** 20:.1f} МБ/с'
+                )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import compute_all, refresh
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500)
+        parser.add_argument(
+            '--recipe', type=int, nargs='*', help='recipe ids to refresh'
+        )
+
+    def handle(self, *args, **options):
+        if options['recipe']:
+            refresh(options['recipe'])
+        else:
+            compute_all(options['batch'])
+        self.stdout.write(self.style.SUCCESS('Готово.'))
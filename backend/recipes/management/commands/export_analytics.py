@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает таблицы для аналитики в CSV (gzip) или Parquet. '
+        'На PostgreSQL CSV пишется через COPY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables', nargs='*', choices=analytics.TABLES,
+            default=list(analytics.TABLES)
+        )
+        parser.add_argument('--output', default='exports')
+        parser.add_argument(
+            '--format', choices=(analytics.CSV, analytics.PARQUET),
+            default=analytics.CSV
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Псевдоним БД, например реплики.'
+        )
+        parser.add_argument('--since-id', type=int)
+        parser.add_argument('--until-id', type=int)
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Продолжить с последних id из manifest.json.'
+        )
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--batch', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        try:
+            exported = analytics.export(
+                options['tables'], options['output'], options['format'],
+                options['database'], options['since_id'],
+                options['until_id'], options['incremental'],
+                options['threads'], options['batch']
+            )
+        except ImportError as error:
+            raise CommandError(error)
+        for name, result in exported.items():
+            self.stdout.write(
+                f'{name}: {result["rows"]} строк, id '
+                f'{result["since"]}..{result["until"]} -> {result["file"]}'
+            )
@@ -3,19 +3,32 @@ import json
 from django.core.management.base import BaseCommand
 from django.db.utils import IntegrityError
 
+from jobs.queue import enqueue
 from recipes.models import Ingredient, Tag
 
+CHUNK_SIZE = 1000
+
 
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--path', help='file path', type=str)
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='import in background jobs'
+        )
 
     def handle(self, *args, **options):
         file_path = options['path']
 
         with open(file_path, encoding='utf-8') as f:
             data = json.load(f)
-            if 'measurement_unit' in data[0]:
+            if options['enqueue']:
+                task = 'recipes.load_tags'
+                if 'measurement_unit' in data[0]:
+                    task = 'recipes.load_ingredients'
+                for start in range(0, len(data), CHUNK_SIZE):
+                    enqueue(task, items=data[start:start + CHUNK_SIZE])
+            elif 'measurement_unit' in data[0]:
                 for item in data:
                     try:
                         Ingredient.objects.create(
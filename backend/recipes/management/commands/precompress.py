@@ -0,0 +1,47 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodgram.compression import GZIP, compress
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт .gz копии статики и документации для gzip_static в nginx.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='directories')
+        parser.add_argument('--level', type=int, default=9)
+
+    def handle(self, *args, **options):
+        written = 0
+        for root in options['paths'] or [settings.STATIC_ROOT]:
+            for path in self.files(root):
+                written += self.precompress(path, options['level'])
+        self.stdout.write(self.style.SUCCESS(f'Записано файлов: {written}'))
+
+    def files(self, root):
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(settings.PRECOMPRESS_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+    def precompress(self, path, level):
+        if os.path.getsize(path) < settings.COMPRESSION_MIN_SIZE:
+            return 0
+        target = path + '.gz'
+        if (
+            os.path.exists(target)
+            and os.path.getmtime(target) >= os.path.getmtime(path)
+        ):
+            return 0
+        with open(path, 'rb') as f:
+            content = f.read()
+        compressed = compress(content, GZIP, min(level, 9))
+        if len(compressed) >= len(content):
+            return 0
+        with open(target, 'wb') as f:
+            f.write(compressed)
+        return 1
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import Change
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет старые записи журнала изменений. Последняя удаляемая '
+        'запись становится меткой PRUNE: по ней клиенты с более старым '
+        'курсором получают reset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_RETENTION_DAYS
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        last = Change.objects.filter(created__lt=cutoff).order_by(
+            '-id'
+        ).values_list('id', flat=True).first()
+        deleted = 0
+        if last is not None:
+            with transaction.atomic():
+                deleted, _ = Change.objects.filter(id__lt=last).delete()
+                Change.objects.filter(id=last).update(
+                    user=None, operation=Change.PRUNE
+                )
+        self.stdout.write(self.style.SUCCESS(f'Удалено: {deleted}'))
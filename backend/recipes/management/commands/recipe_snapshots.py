@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from recipes.fast_serializers import (backfill_snapshots, build_documents,
+                                      read_documents, rebuild_snapshots)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает недостающие снимки рецептов или сверяет сохранённые '
+        'снимки с живой сериализацией. Сверка ничего не пишет, пока не '
+        'передан --fix.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true')
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать расходящиеся снимки при сверке.'
+        )
+        parser.add_argument('--batch', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            built = backfill_snapshots(options['batch'])
+            self.stdout.write(self.style.SUCCESS(f'Собрано: {built}'))
+            return
+        stale = []
+        missing = []
+        recipe_ids = Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        )
+        batch = options['batch']
+        for start in range(0, recipe_ids.count(), batch):
+            ids = list(recipe_ids[start:start + batch])
+            stored = read_documents(ids)
+            live = build_documents(ids)
+            for pk in ids:
+                if pk not in stored:
+                    missing.append(pk)
+                elif stored[pk] != live.get(pk):
+                    stale.append(pk)
+        for pk in stale:
+            self.stdout.write(f'Рецепт {pk}: снимок устарел')
+        self.stdout.write(f'Без снимка: {len(missing)}')
+        if options['fix'] and (stale or missing):
+            rebuild_snapshots(stale + missing)
+        style = self.style.ERROR if stale else self.style.SUCCESS
+        self.stdout.write(style(f'Расхождений: {len(stale)}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes import popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов за окно. С --rebuild сначала '
+        'восстанавливает интервалы по меткам времени избранного и корзины.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            buckets = popularity.rebuild_activity()
+            self.stdout.write(f'Интервалов восстановлено: {buckets}')
+        else:
+            popularity.counters.flush()
+        recipes = popularity.refresh_stats()
+        self.stdout.write(
+            self.style.SUCCESS(f'Рецептов в рейтинге: {recipes}')
+        )
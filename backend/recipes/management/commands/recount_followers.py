@@ -0,0 +1,44 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from jobs.queue import enqueue
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает User.followers_count по подпискам и раскладывает по '
+        'лентам рецепты авторов, опустившихся ниже TIMELINE_FANOUT_LIMIT. '
+        'После повышения порога передайте прежний в --previous-limit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--previous-limit', type=int)
+
+    def handle(self, *args, **options):
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        previous = options['previous_limit'] or limit
+        counts = dict(Subscription.objects.values_list('author_id').annotate(
+            Count('id')
+        ).order_by())
+        updates = defaultdict(list)
+        fan_out = []
+        for pk, stored in User.objects.values_list(
+            'id', 'followers_count'
+        ).iterator():
+            actual = counts.get(pk, 0)
+            if actual != stored:
+                updates[actual].append(pk)
+            if actual < limit and max(stored, actual) >= min(previous, limit):
+                fan_out.append(pk)
+        for actual, ids in updates.items():
+            User.objects.filter(id__in=ids).update(followers_count=actual)
+        for pk in fan_out:
+            enqueue('recipes.fan_out_author', priority=-1, author_id=pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {sum(map(len, updates.values()))}, '
+            f'авторов для раскладки: {len(fan_out)}'
+        ))
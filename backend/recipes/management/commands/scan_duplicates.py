@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes import fingerprints
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит отпечатки рецептов в несколько процессов и ищет точные и '
+        'почти точные копии в каталоге.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None)
+        parser.add_argument('--batch', type=int, default=1000)
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать отпечатки всех рецептов.'
+        )
+        parser.add_argument(
+            '--flag', action='store_true',
+            help='Отметить найденные копии для модерации.'
+        )
+
+    def handle(self, *args, **options):
+        built = fingerprints.fingerprint_catalog(
+            options['processes'], options['batch'], options['rebuild']
+        )
+        self.stdout.write(f'Отпечатков построено: {built}')
+        duplicates = fingerprints.scan()
+        for copy, original, score in duplicates:
+            self.stdout.write(
+                f'Рецепт {copy} повторяет {original} (сходство {score:.2f})'
+            )
+        if options['flag']:
+            fingerprints.flag(duplicates)
+        self.stdout.write(
+            self.style.SUCCESS(f'Найдено копий: {len(duplicates)}')
+        )
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+BOOT = (
+    'import django; django.setup(); '
+    'from foodgram import startup, wsgi; startup.preload()'
+)
+
+
+def parse_importtime(lines):
+    """Строки «import time: self | cumulative | package» в кортежи."""
+    modules = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        modules.append((int(own), int(cumulative), name.rstrip()))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает загрузку приложения в отдельном процессе с '
+        '-X importtime и показывает самые медленные импорты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument(
+            '--sort', choices=('self', 'cumulative'), default='cumulative'
+        )
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'foodgram.settings'
+            ),
+        }
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT],
+            cwd=settings.BASE_DIR, env=env,
+            stderr=subprocess.PIPE, universal_newlines=True
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode:
+            self.stderr.write(process.stderr[-2000:])
+            return
+        modules = parse_importtime(process.stderr.splitlines())
+        column = 0 if options['sort'] == 'self' else 1
+        modules.sort(key=lambda module: module[column], reverse=True)
+        self.stdout.write(f'{"self, мс":>10} {"всего, мс":>10}  модуль')
+        for own, cumulative, name in modules[:options['top']]:
+            self.stdout.write(
+                f'{own / 1000:>10.1f} {cumulative / 1000:>10.1f}  {name}'
+            )
+        total = sum(own for own, _, _ in modules) / 1e6
+        self.stdout.write(self.style.SUCCESS(
+            f'Модулей: {len(modules)}, импорт: {total:.2f} с, '
+            f'загрузка процесса: {elapsed:.2f} с'
+        ))
@@ -0,0 +1,156 @@
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from users.models import Subscription
+from .models import Favorite, ShoppingCart
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTIONS = 'subscriptions'
+
+SOURCES = {
+    FAVORITES: (Favorite, 'recipe_id'),
+    SHOPPING_CART: (ShoppingCart, 'recipe_id'),
+    SUBSCRIPTIONS: (Subscription, 'author_id'),
+}
+
+
+class IdSet:
+    """Отсортированный массив id с поиском за O(log n)."""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = array('q', sorted(ids))
+
+    def __contains__(self, pk):
+        index = bisect_left(self.ids, pk)
+        return index < len(self.ids) and self.ids[index] == pk
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getstate__(self):
+        return self.ids.tobytes()
+
+    def __setstate__(self, state):
+        self.ids = array('q')
+        self.ids.frombytes(state)
+
+    def add(self, pk):
+        if pk not in self:
+            insort(self.ids, pk)
+
+    def discard(self, pk):
+        index = bisect_left(self.ids, pk)
+        if index < len(self.ids) and self.ids[index] == pk:
+            del self.ids[index]
+
+
+def cache_key(user_id, kind):
+    return f'membership:{kind}:{user_id}'
+
+
+def count_key(user_id, kind):
+    return f'membership:{kind}:{user_id}:count'
+
+
+def invalidate(model, *user_ids):
+    """Сбрасывает кэш членства пользователей после фиксации транзакции.
+
+    Вызывается из сигналов моделей, поэтому покрывает и админку, и
+    каскадные удаления, а не только API.
+    """
+    if not settings.MEMBERSHIP_CACHE_TIMEOUT or not user_ids:
+        return
+    keys = [
+        key(user_id, kind)
+        for kind, (source, _) in SOURCES.items() if source is model
+        for user_id in user_ids
+        for key in (cache_key, count_key)
+    ]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_rows(queryset):
+    """Сбрасывает кэш владельцев строк перед удалением в обход сигналов."""
+    if not settings.MEMBERSHIP_CACHE_TIMEOUT or not any(
+        queryset.model is source for source, _ in SOURCES.values()
+    ):
+        return
+    invalidate(queryset.model, *queryset.order_by().values_list(
+        'user_id', flat=True
+    ).distinct())
+
+
+class Membership:
+    def __init__(self, user):
+        self.user = user
+        self.sets = {}
+
+    def get(self, kind):
+        if kind not in self.sets:
+            self.sets[kind] = self.load(kind)
+        return self.sets[kind]
+
+    def load(self, kind):
+        if not self.user.is_authenticated:
+            return IdSet()
+        timeout = settings.MEMBERSHIP_CACHE_TIMEOUT
+        key = cache_key(self.user.id, kind)
+        if timeout:
+            ids = cache.get(key)
+            if ids is not None:
+                return ids
+        model, field = SOURCES[kind]
+        ids = IdSet(
+            model.objects.filter(
+                user_id=self.user.id
+            ).values_list(field, flat=True)
+        )
+        if timeout:
+            cache.set(key, ids, timeout)
+        return ids
+
+    def count(self, kind):
+        """Размер набора без загрузки самих id, если их ещё нет."""
+        if kind in self.sets:
+            return len(self.sets[kind])
+        if not self.user.is_authenticated:
+            return 0
+        timeout = settings.MEMBERSHIP_CACHE_TIMEOUT
+        key = count_key(self.user.id, kind)
+        if timeout:
+            count = cache.get(key)
+            if count is not None:
+                return count
+        model, _ = SOURCES[kind]
+        count = model.objects.filter(user_id=self.user.id).count()
+        if timeout:
+            cache.set(key, count, timeout)
+        return count
+
+    def contains(self, kind, pk):
+        return self.user.is_authenticated and pk in self.get(kind)
+
+    def changed(self, kind, pk, present):
+        ids = self.get(kind)
+        if present:
+            ids.add(pk)
+        else:
+            ids.discard(pk)
+
+
+def get_membership(request):
+    membership = getattr(request, 'membership', None)
+    if membership is None or membership.user is not request.user:
+        membership = Membership(request.user)
+        request.membership = membership
+    return membership
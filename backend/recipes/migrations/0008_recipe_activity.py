@@ -0,0 +1,88 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:34
+
+from datetime import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Записи, существовавшие до миграции, получают дату вне окна популярности.
+BACKFILLED = datetime(1970, 1, 1, tzinfo=django.utils.timezone.utc)
+
+
+def create_stats(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeStats = apps.get_model('recipes', 'RecipeStats')
+    RecipeStats.objects.bulk_create(
+        RecipeStats(recipe_id=recipe_id)
+        for recipe_id in Recipe.objects.values_list('id', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Начало интервала')),
+                ('favorites', models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное')),
+                ('shopping_carts', models.PositiveIntegerField(default=0, verbose_name='Добавлений в корзину')),
+            ],
+            options={
+                'verbose_name': 'Активность по рецепту',
+                'verbose_name_plural': 'Активность по рецептам',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='recipes.Recipe', verbose_name='Рецепт')),
+                ('popular', models.PositiveIntegerField(default=0, verbose_name='Популярность за окно')),
+                ('trending', models.FloatField(default=0, verbose_name='Набирает популярность')),
+            ],
+            options={
+                'verbose_name': 'Статистика рецепта',
+                'verbose_name_plural': 'Статистика рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=BACKFILLED, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=BACKFILLED, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipestats',
+            index=models.Index(fields=['-popular', '-recipe'], name='recipe_stats_popular_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipestats',
+            index=models.Index(fields=['-trending', '-recipe'], name='recipe_stats_trending_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='recipeactivity',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='recipes.Recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeactivity',
+            index=models.Index(fields=['bucket'], name='recipe_activity_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeactivity',
+            constraint=models.UniqueConstraint(fields=('recipe', 'bucket'), name='unique_recipe_activity'),
+        ),
+        migrations.RunPython(create_stats, migrations.RunPython.noop),
+    ]
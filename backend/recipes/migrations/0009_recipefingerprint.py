@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeFingerprintBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True, verbose_name='Ключ LSH')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_bands', to='recipes.Recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Полоса LSH',
+                'verbose_name_plural': 'Полосы LSH',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeFingerprint',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='recipes.Recipe', verbose_name='Рецепт')),
+                ('exact', models.CharField(db_index=True, max_length=40, verbose_name='Хеш названия и состава')),
+                ('signature', models.BinaryField(verbose_name='MinHash-подпись')),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recipes.Recipe', verbose_name='Дубликат рецепта')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток рецепта',
+                'verbose_name_plural': 'Отпечатки рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='change',
+            name='operation',
+            field=models.CharField(choices=[('upsert', 'Изменение'), ('delete', 'Удаление'), ('prune', 'Журнал обрезан')], max_length=6, verbose_name='Операция'),
+        ),
+    ]
@@ -65,11 +65,22 @@ class Recipe(models.Model):
         verbose_name='Время приготовления (в минутах)',
         validators=[MinValueValidator(1, message=COOKING_TIME_GREATER_ONE)]
     )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия', default=1, editable=False
+    )
 
     class Meta:
         ordering = ('-id',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-id'], name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'
+            ),
+        ]
 
 
 class IngredientInRecipe(models.Model):
@@ -104,6 +115,9 @@ class Favorite(models.Model):
         Recipe, on_delete=models.CASCADE,
         related_name='favorites'
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено', auto_now_add=True
+    )
 
     class Meta:
         constraints = [models.UniqueConstraint(
@@ -121,9 +135,205 @@ class ShoppingCart(models.Model):
         Recipe, on_delete=models.CASCADE,
         related_name='shopping_cart'
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено', auto_now_add=True
+    )
 
     class Meta:
         constraints = [models.UniqueConstraint(
             fields=['user', 'recipe'],
             name='unique_shopping_cart'
         )]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='timeline', verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='timeline_entries', verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'],
+            name='unique_timeline_entry'
+        )]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='similar', verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [models.UniqueConstraint(
+            fields=['recipe', 'similar'],
+            name='unique_similar_recipe'
+        )]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score_idx'
+            )
+        ]
+
+
+class Change(models.Model):
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Корзина'),
+        (SUBSCRIPTION, 'Подписка'),
+    )
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    PRUNE = 'prune'
+    OPERATIONS = (
+        (UPSERT, 'Изменение'),
+        (DELETE, 'Удаление'),
+        (PRUNE, 'Журнал обрезан'),
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+', verbose_name='Пользователь'
+    )
+    kind = models.CharField(
+        verbose_name='Тип объекта', max_length=20, choices=KINDS
+    )
+    object_id = models.PositiveIntegerField(verbose_name='Id объекта')
+    operation = models.CharField(
+        verbose_name='Операция', max_length=6, choices=OPERATIONS
+    )
+    created = models.DateTimeField(
+        verbose_name='Время изменения', auto_now_add=True
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Изменения'
+        indexes = [
+            models.Index(fields=['user', 'id'], name='change_user_id_idx')
+        ]
+
+
+class RecipeSnapshot(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='snapshot', verbose_name='Рецепт'
+    )
+    data = models.TextField(verbose_name='Публичное представление')
+    updated = models.DateTimeField(verbose_name='Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Снимок рецепта'
+        verbose_name_plural = 'Снимки рецептов'
+
+
+class RecipeActivity(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='activity', verbose_name='Рецепт'
+    )
+    bucket = models.DateTimeField(verbose_name='Начало интервала')
+    favorites = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное', default=0
+    )
+    shopping_carts = models.PositiveIntegerField(
+        verbose_name='Добавлений в корзину', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Активность по рецепту'
+        verbose_name_plural = 'Активность по рецептам'
+        constraints = [models.UniqueConstraint(
+            fields=['recipe', 'bucket'],
+            name='unique_recipe_activity'
+        )]
+        indexes = [
+            models.Index(fields=['bucket'], name='recipe_activity_bucket_idx')
+        ]
+
+
+class RecipeStats(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats', verbose_name='Рецепт'
+    )
+    popular = models.PositiveIntegerField(
+        verbose_name='Популярность за окно', default=0
+    )
+    trending = models.FloatField(
+        verbose_name='Набирает популярность', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика рецепта'
+        verbose_name_plural = 'Статистика рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'],
+                name='recipe_stats_popular_id_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='recipe_stats_trending_id_idx'
+            ),
+        ]
+
+
+class RecipeFingerprint(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='fingerprint', verbose_name='Рецепт'
+    )
+    exact = models.CharField(
+        verbose_name='Хеш названия и состава', max_length=40, db_index=True
+    )
+    signature = models.BinaryField(verbose_name='MinHash-подпись')
+    duplicate_of = models.ForeignKey(
+        Recipe, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name='Дубликат рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Отпечаток рецепта'
+        verbose_name_plural = 'Отпечатки рецептов'
+
+
+class RecipeFingerprintBand(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='fingerprint_bands', verbose_name='Рецепт'
+    )
+    key = models.BigIntegerField(verbose_name='Ключ LSH', db_index=True)
+
+    class Meta:
+        verbose_name = 'Полоса LSH'
+        verbose_name_plural = 'Полосы LSH'
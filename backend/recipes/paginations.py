@@ -1,5 +1,39 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class QueryParamLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = settings.CURSOR_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.CURSOR_MAX_PAGE_SIZE
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для нефильтрованных больших таблиц берёт оценку из pg_class."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class EstimatedCountPagination(QueryParamLimitPagination):
+    django_paginator_class = EstimatedCountPaginator
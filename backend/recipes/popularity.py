@@ -0,0 +1,224 @@
+import atexit
+import logging
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from .models import (Favorite, Recipe, RecipeActivity, RecipeStats,
+                     ShoppingCart)
+
+logger = logging.getLogger(__name__)
+
+FAVORITES = 'favorites'
+SHOPPING_CARTS = 'shopping_carts'
+EVENT_SOURCES = {
+    FAVORITES: Favorite,
+    SHOPPING_CARTS: ShoppingCart,
+}
+
+
+def bucket_index(timestamp):
+    return int(timestamp // settings.POPULARITY_BUCKET_SECONDS)
+
+
+def bucket_start(index):
+    return datetime.fromtimestamp(
+        index * settings.POPULARITY_BUCKET_SECONDS, tz=timezone.utc
+    )
+
+
+class RingCounter:
+    """Счётчики последних size интервалов; старые затираются по кругу."""
+
+    __slots__ = ('head', 'counts')
+
+    def __init__(self, size, head):
+        self.head = head
+        self.counts = array('l', [0] * size)
+
+    def add(self, index, amount=1):
+        size = len(self.counts)
+        if index > self.head:
+            for skipped in range(
+                self.head + 1, min(index, self.head + size) + 1
+            ):
+                self.counts[skipped % size] = 0
+            self.head = index
+        elif index <= self.head - size:
+            return
+        self.counts[index % size] += amount
+
+    def items(self):
+        size = len(self.counts)
+        for index in range(self.head - size + 1, self.head + 1):
+            count = self.counts[index % size]
+            if count:
+                yield index, count
+
+
+class Counters:
+    """Копит события в памяти процесса и периодически сбрасывает их в БД."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rings = {}
+        self.flushed = time.monotonic()
+
+    def record(self, recipe_id, kind, timestamp=None):
+        index = bucket_index(
+            time.time() if timestamp is None else timestamp
+        )
+        with self.lock:
+            ring = self.rings.get((recipe_id, kind))
+            if ring is None:
+                ring = self.rings[(recipe_id, kind)] = RingCounter(
+                    settings.POPULARITY_WINDOW_BUCKETS, index
+                )
+            ring.add(index)
+            return (
+                time.monotonic() - self.flushed
+                >= settings.POPULARITY_FLUSH_INTERVAL
+            )
+
+    def flush(self):
+        with self.lock:
+            rings, self.rings = self.rings, {}
+            self.flushed = time.monotonic()
+        if not rings:
+            return 0
+        deltas = defaultdict(dict)
+        for (recipe_id, kind), ring in rings.items():
+            for index, count in ring.items():
+                deltas[(recipe_id, index)][kind] = count
+        for (recipe_id, index), counts in deltas.items():
+            add_activity(recipe_id, bucket_start(index), counts)
+        return len(deltas)
+
+
+def add_activity(recipe_id, bucket, counts):
+    activity = RecipeActivity.objects.filter(
+        recipe_id=recipe_id, bucket=bucket
+    )
+    increments = {kind: F(kind) + count for kind, count in counts.items()}
+    if activity.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            RecipeActivity.objects.create(
+                recipe_id=recipe_id, bucket=bucket, **counts
+            )
+    except IntegrityError:
+        activity.update(**increments)
+
+
+def window_start(now):
+    return now - timedelta(
+        seconds=settings.POPULARITY_BUCKET_SECONDS
+        * settings.POPULARITY_WINDOW_BUCKETS
+    )
+
+
+def refresh_stats(now=None):
+    """Пересчитывает popular и trending по интервалам за окно.
+
+    popular — сумма событий за окно, trending — та же сумма с
+    экспоненциальным затуханием по возрасту интервала. Пишутся только
+    изменившиеся строки: рецепты без активности за окно обнуляются один
+    раз, а рецептам без строки статистики она создаётся с нулями.
+    """
+    now = now or timezone.now()
+    start = window_start(now)
+    half_life = settings.TRENDING_HALF_LIFE
+    popular = defaultdict(int)
+    trending = defaultdict(float)
+    with transaction.atomic():
+        RecipeActivity.objects.filter(bucket__lt=start).delete()
+        for recipe_id, bucket, favorites, shopping_carts in (
+            RecipeActivity.objects.values_list(
+                'recipe_id', 'bucket', 'favorites', 'shopping_carts'
+            ).iterator()
+        ):
+            count = favorites + shopping_carts
+            age = max((now - bucket).total_seconds(), 0)
+            popular[recipe_id] += count
+            trending[recipe_id] += count * 0.5 ** (age / half_life)
+        RecipeStats.objects.bulk_create(
+            [
+                RecipeStats(recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    stats__isnull=True
+                ).values_list('id', flat=True)
+            ],
+            ignore_conflicts=True
+        )
+        active = RecipeActivity.objects.values('recipe_id')
+        RecipeStats.objects.exclude(recipe_id__in=active).exclude(
+            popular=0, trending=0
+        ).update(popular=0, trending=0)
+        changed = []
+        for stats in RecipeStats.objects.filter(
+            recipe_id__in=active
+        ).iterator():
+            values = popular[stats.recipe_id], trending[stats.recipe_id]
+            if (stats.popular, stats.trending) != values:
+                stats.popular, stats.trending = values
+                changed.append(stats)
+        RecipeStats.objects.bulk_update(changed, ['popular', 'trending'])
+    return len(popular)
+
+
+def rebuild_activity(now=None):
+    """Восстанавливает интервалы окна по меткам времени событий."""
+    now = now or timezone.now()
+    start = window_start(now)
+    deltas = defaultdict(lambda: defaultdict(int))
+    for kind, model in EVENT_SOURCES.items():
+        for recipe_id, created in model.objects.filter(
+            created__gte=start
+        ).values_list('recipe_id', 'created').iterator():
+            index = bucket_index(created.timestamp())
+            deltas[(recipe_id, index)][kind] += 1
+    with transaction.atomic():
+        RecipeActivity.objects.all().delete()
+        RecipeActivity.objects.bulk_create(
+            RecipeActivity(
+                recipe_id=recipe_id, bucket=bucket_start(index), **counts
+            )
+            for (recipe_id, index), counts in deltas.items()
+        )
+    return len(deltas)
+
+
+counters = Counters()
+
+
+def record(recipe_id, kind):
+    if counters.record(recipe_id, kind):
+        flush()
+
+
+def flush():
+    if counters.flush():
+        enqueue('recipes.refresh_stats', priority=-1)
+
+
+def flush_at_exit():
+    """Сбрасывает счётчики при остановке процесса, если БД ещё доступна."""
+    try:
+        counters.flush()
+    except DatabaseError as error:
+        logger.warning(
+            'Счётчики популярности не сохранены при остановке процесса: %s',
+            error
+        )
+
+
+atexit.register(flush_at_exit)
@@ -1,10 +1,25 @@
-from rest_framework import serializers
+from django.db import transaction
+from django.db.models import F
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 
+from jobs.queue import enqueue
 from users.serializers import UserSerializer
+from . import fingerprints
+from .fast_serializers import rebuild_snapshots
 from .fields import Base64StrToFile
+from .membership import FAVORITES, SHOPPING_CART, get_membership
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                      ShoppingCart, Tag)
 
+DUPLICATE_RECIPE = 'Такой рецепт уже опубликован (id={}).'
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Рецепт изменён другим запросом, загрузите его заново.'
+    default_code = 'precondition_failed'
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -61,24 +76,12 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
 
     def get_is_favorited(self, recipe):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Favorite.objects.filter(
-                user__id=user.id,
-                recipe__id=recipe.id
-            ).exists()
-        )
+        membership = get_membership(self.context.get('request'))
+        return membership.contains(FAVORITES, recipe.id)
 
     def get_is_in_shopping_cart(self, recipe):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and ShoppingCart.objects.filter(
-                user__id=user.id,
-                recipe__id=recipe.id
-            ).exists()
-        )
+        membership = get_membership(self.context.get('request'))
+        return membership.contains(SHOPPING_CART, recipe.id)
 
     def get_ingredients(self, recipe):
         recipes = IngredientInRecipe.objects.filter(recipe=recipe)
@@ -146,28 +149,90 @@ class RecipeSerializer(serializers.ModelSerializer):
             result_tags.append(tag)
         return result_tags
 
-    def preprocess_recipe(self, recipe):
-        ingredients = self.preprocess_ingredients()
-        tags = self.preprocess_tags()
+    def check_duplicates(self, validated_data, ingredients, recipe=None):
+        fingerprint = fingerprints.build(
+            validated_data.get('name', getattr(recipe, 'name', '')),
+            validated_data.get('text', getattr(recipe, 'text', '')),
+            [(ingredient.id, amount) for ingredient, amount in ingredients]
+        )
+        policy = fingerprints.get_policy()
+        if policy == fingerprints.OFF:
+            return fingerprint, None
+        duplicate = fingerprints.find_duplicate(
+            fingerprint, exclude=getattr(recipe, 'id', None)
+        )
+        if duplicate is not None and policy == fingerprints.REJECT:
+            raise serializers.ValidationError(
+                DUPLICATE_RECIPE.format(duplicate)
+            )
+        return fingerprint, duplicate
+
+    def preprocess_recipe(self, recipe, tags, ingredients):
         recipe.tags.set(tags)
-        recipe.save()
-        for ingredient, amount in ingredients:
-            IngredientInRecipe.objects.create(
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
                 amount=amount, ingredient=ingredient, recipe=recipe
             )
+            for ingredient, amount in ingredients
+        )
         return recipe
 
     def create(self, validated_data):
-        recipe = Recipe.objects.create(**validated_data)
-        return self.preprocess_recipe(recipe)
+        ingredients = self.preprocess_ingredients()
+        tags = self.preprocess_tags()
+        fingerprint, duplicate = self.check_duplicates(
+            validated_data, ingredients
+        )
+        with transaction.atomic():
+            recipe = self.preprocess_recipe(
+                Recipe.objects.create(**validated_data), tags, ingredients
+            )
+        fingerprints.store([(recipe.id, fingerprint, duplicate)])
+        rebuild_snapshots([recipe.id])
+        enqueue('recipes.fan_out', recipe_id=recipe.id)
+        enqueue(
+            'recipes.refresh_similar', priority=-1, recipe_ids=[recipe.id]
+        )
+        return recipe
 
     def update(self, recipe, validated_data):
-        ingredients_in_recipe = IngredientInRecipe.objects.filter(
-            recipe__id=recipe.id
+        """Проверки до транзакции, запись — одной короткой транзакцией.
+
+        Версия сравнивается и увеличивается одним UPDATE: если рецепт
+        изменили после чтения (или после выдачи ETag из If-Match), ответ
+        412, ничего не записано и новая картинка удалена.
+        """
+        version = validated_data.pop('version', recipe.version)
+        ingredients = self.preprocess_ingredients()
+        tags = self.preprocess_tags()
+        fingerprint, duplicate = self.check_duplicates(
+            validated_data, ingredients, recipe
+        )
+        image = validated_data.pop('image', None)
+        if image is not None:
+            recipe.image.save(image.name, image, save=False)
+        for attr, value in validated_data.items():
+            setattr(recipe, attr, value)
+        try:
+            with transaction.atomic():
+                if not Recipe.objects.filter(
+                    id=recipe.id, version=version
+                ).update(version=F('version') + 1):
+                    raise PreconditionFailed
+                recipe.version = version + 1
+                recipe.save()
+                IngredientInRecipe.objects.filter(recipe=recipe).delete()
+                self.preprocess_recipe(recipe, tags, ingredients)
+        except Exception:
+            if image is not None:
+                recipe.image.delete(save=False)
+            raise
+        fingerprints.store([(recipe.id, fingerprint, duplicate)])
+        rebuild_snapshots([recipe.id])
+        enqueue(
+            'recipes.refresh_similar', priority=-1, recipe_ids=[recipe.id]
         )
-        ingredients_in_recipe.delete()
-        recipe = self.preprocess_recipe(recipe)
-        return super().update(recipe, validated_data)
+        return recipe
 
     class Meta:
         model = Recipe
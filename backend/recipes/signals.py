@@ -0,0 +1,142 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from users.models import Subscription, User
+from . import membership, popularity, timeline
+from .fast_serializers import AUTHOR_FIELDS
+from .models import (Change, Favorite, Ingredient, Recipe, RecipeSnapshot,
+                     RecipeStats, ShoppingCart, Tag)
+
+MEMBERSHIP_KINDS = {
+    Favorite: Change.FAVORITE,
+    ShoppingCart: Change.SHOPPING_CART,
+}
+POPULARITY_KINDS = {
+    Favorite: popularity.FAVORITES,
+    ShoppingCart: popularity.SHOPPING_CARTS,
+}
+
+
+def record(user_id, kind, object_id, operation):
+    """Пишет изменение после фиксации транзакции.
+
+    Так id изменений растут в порядке фиксации, и клиент синхронизации не
+    перескочит курсором через изменение, которое зафиксируется позже.
+    Рецепт к этому моменту уже сохранён вместе с тегами и ингредиентами.
+    """
+    transaction.on_commit(lambda: Change.objects.create(
+        user_id=user_id, kind=kind, object_id=object_id, operation=operation
+    ))
+
+
+def invalidate_snapshots(**lookup):
+    """Сбрасывает снимки, зависящие от изменённого объекта.
+
+    Чтение пересоберёт недостающие снимки само, задача лишь прогревает их
+    после фиксации транзакции.
+    """
+    if RecipeSnapshot.objects.filter(**lookup).delete()[0]:
+        transaction.on_commit(lambda: enqueue(
+            'recipes.backfill_snapshots', priority=-1
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    if created:
+        RecipeStats.objects.create(recipe=instance)
+    RecipeSnapshot.objects.filter(recipe_id=instance.id).delete()
+    record(None, Change.RECIPE, instance.id, Change.UPSERT)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record(None, Change.RECIPE, instance.id, Change.DELETE)
+    if instance.image:
+        names = [instance.image.name]
+        transaction.on_commit(lambda: enqueue(
+            'recipes.delete_images', priority=-1, names=names
+        ))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def membership_saved(sender, instance, created, **kwargs):
+    if created:
+        membership.invalidate(sender, instance.user_id)
+        record(
+            instance.user_id, MEMBERSHIP_KINDS[sender],
+            instance.recipe_id, Change.UPSERT
+        )
+        popularity.record(instance.recipe_id, POPULARITY_KINDS[sender])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def membership_deleted(sender, instance, **kwargs):
+    membership.invalidate(sender, instance.user_id)
+    record(
+        instance.user_id, MEMBERSHIP_KINDS[sender],
+        instance.recipe_id, Change.DELETE
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_saved(sender, instance, created, **kwargs):
+    if created:
+        membership.invalidate(sender, instance.user_id)
+        timeline.follower_added(instance.author_id)
+        record(
+            instance.user_id, Change.SUBSCRIPTION,
+            instance.author_id, Change.UPSERT
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    membership.invalidate(sender, instance.user_id)
+    timeline.follower_removed(instance.author_id)
+    record(
+        instance.user_id, Change.SUBSCRIPTION,
+        instance.author_id, Change.DELETE
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    invalidate_snapshots(recipe__tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    invalidate_snapshots(recipe__ingredients=instance)
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance, update_fields, **kwargs):
+    """Запоминает, изменились ли поля автора, попадающие в снимки.
+
+    Смена пароля, last_login и прочие сохранения пользователя снимки не
+    сбрасывают.
+    """
+    fields = [
+        field for field in AUTHOR_FIELDS
+        if update_fields is None or field in update_fields
+    ]
+    old = None
+    if instance.pk is not None and fields:
+        old = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance.author_changed = old is not None and any(
+        old[field] != getattr(instance, field) for field in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, **kwargs):
+    if not created and instance.author_changed:
+        invalidate_snapshots(recipe__author=instance)
@@ -0,0 +1,222 @@
+import heapq
+from collections import defaultdict
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from scipy.sparse import csr_matrix
+
+from .models import Favorite, IngredientInRecipe, Recipe, SimilarRecipe
+
+
+def load_pairs(model, column, recipe_ids=None):
+    queryset = model.objects.all()
+    if recipe_ids is not None:
+        queryset = queryset.filter(recipe_id__in=recipe_ids.tolist())
+    pairs = np.fromiter(
+        chain.from_iterable(
+            queryset.values_list('recipe_id', column).iterator()
+        ),
+        dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def build_matrix(pairs, recipe_ids):
+    """Бинарная матрица рецепты x признаки (ингредиенты или пользователи)."""
+    columns, inverse = np.unique(pairs[:, 1], return_inverse=True)
+    return csr_matrix(
+        (
+            np.ones(len(pairs), dtype=np.float32),
+            (np.searchsorted(recipe_ids, pairs[:, 0]), inverse)
+        ),
+        shape=(len(recipe_ids), len(columns))
+    )
+
+
+def overlap(matrix, batch, cosine=False):
+    """Жаккар (или косинус) строк batch со всеми строками матрицы."""
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    common = (matrix[batch] @ matrix.T).tocoo()
+    left = sizes[batch][common.row]
+    right = sizes[common.col]
+    if cosine:
+        data = common.data / np.sqrt(left * right)
+    else:
+        data = common.data / (left + right - common.data)
+    return csr_matrix((data, (common.row, common.col)), shape=common.shape)
+
+
+def score_rows(recipe_ids, ingredients, favorites, batch):
+    """Ненулевые оценки сходства строк batch, без самого рецепта."""
+    scores = (
+        settings.SIMILARITY_INGREDIENTS_WEIGHT * overlap(ingredients, batch)
+        + settings.SIMILARITY_FAVORITES_WEIGHT
+        * overlap(favorites, batch, cosine=True)
+    ).tocsr()
+    for row, index in enumerate(batch):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        columns = scores.indices[start:end]
+        data = scores.data[start:end]
+        keep = (columns != index) & (data > 0)
+        yield recipe_ids[index], recipe_ids[columns[keep]], data[keep]
+
+
+def top(similar_ids, scores):
+    count = settings.SIMILAR_RECIPES_COUNT
+    if len(scores) > count:
+        best = np.argpartition(-scores, count)[:count]
+        similar_ids, scores = similar_ids[best], scores[best]
+    return zip(similar_ids, scores)
+
+
+def top_neighbours(recipe_ids, ingredients, favorites, batch):
+    for recipe_id, similar_ids, scores in score_rows(
+        recipe_ids, ingredients, favorites, batch
+    ):
+        yield recipe_id, top(similar_ids, scores)
+
+
+def store(neighbours):
+    recipe_ids = []
+    rows = []
+    for recipe_id, similar in neighbours:
+        recipe_ids.append(int(recipe_id))
+        rows.extend(
+            SimilarRecipe(
+                recipe_id=int(recipe_id), similar_id=int(similar_id),
+                score=float(score)
+            )
+            for similar_id, score in similar
+        )
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(rows)
+
+
+def load_matrices(recipe_ids, restrict):
+    filter_ids = recipe_ids if restrict else None
+    return (
+        build_matrix(
+            load_pairs(IngredientInRecipe, 'ingredient_id', filter_ids),
+            recipe_ids
+        ),
+        build_matrix(load_pairs(Favorite, 'user_id', filter_ids), recipe_ids),
+    )
+
+
+def compute_all(batch_size=500):
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64
+    )
+    ingredients, favorites = load_matrices(recipe_ids, restrict=False)
+    for start in range(0, len(recipe_ids), batch_size):
+        store(top_neighbours(
+            recipe_ids, ingredients, favorites,
+            np.arange(start, min(start + batch_size, len(recipe_ids)))
+        ))
+
+
+def top_overlap(model, column, values, recipe_id):
+    """Рецепты с наибольшим числом общих с recipe_id значений column,
+    не больше SIMILARITY_CANDIDATES."""
+    return model.objects.filter(**{f'{column}__in': values}).exclude(
+        recipe_id=recipe_id
+    ).values('recipe_id').annotate(shared=Count('id')).order_by(
+        '-shared'
+    ).values_list('recipe_id', flat=True)[:settings.SIMILARITY_CANDIDATES]
+
+
+def get_candidates(targets):
+    """Кандидаты в соседи: по SIMILARITY_CANDIDATES на рецепт по общим
+    ингредиентам и по общим пользователям в избранном.
+
+    Ингредиенты, которые есть больше чем в доле
+    SIMILARITY_MAX_INGREDIENT_SHARE рецептов (соль, вода), кандидатов не
+    дают: через них связан почти весь каталог. В небольшом каталоге
+    отсечки нет, пока ингредиент встречается не чаще SIMILARITY_CANDIDATES
+    раз.
+    """
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+        recipe_id__in=targets
+    ).values_list('recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].append(ingredient_id)
+    limit = max(
+        settings.SIMILARITY_MAX_INGREDIENT_SHARE * Recipe.objects.count(),
+        settings.SIMILARITY_CANDIDATES
+    )
+    common = set(IngredientInRecipe.objects.filter(
+        ingredient_id__in=set(chain.from_iterable(ingredients.values()))
+    ).values('ingredient_id').annotate(recipes=Count('id')).filter(
+        recipes__gt=limit
+    ).values_list('ingredient_id', flat=True))
+    candidates = set(targets)
+    for target in targets:
+        rare = [pk for pk in ingredients[target] if pk not in common]
+        if rare:
+            candidates.update(top_overlap(
+                IngredientInRecipe, 'ingredient_id', rare, target
+            ))
+        candidates.update(top_overlap(
+            Favorite, 'user_id',
+            Favorite.objects.filter(recipe_id=target).values('user_id'),
+            target
+        ))
+    return candidates
+
+
+def refresh(recipe_ids):
+    """Пересчитывает соседей рецептов и тех, у кого они уже в списке.
+
+    Матрицы строятся только по кандидатам из get_candidates, так что
+    объём работы не зависит от размера каталога. Вызывается задачей
+    recipes.refresh_similar, а не в запросе.
+    """
+    targets = set(Recipe.objects.filter(
+        id__in=set(recipe_ids) | set(SimilarRecipe.objects.filter(
+            similar_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+    ).values_list('id', flat=True))
+    if not targets:
+        return
+    candidates = get_candidates(targets)
+    universe = np.array(sorted(candidates), dtype=np.int64)
+    ingredients, favorites = load_matrices(universe, restrict=True)
+    rows = list(score_rows(
+        universe, ingredients, favorites,
+        np.searchsorted(universe, sorted(targets))
+    ))
+    store(
+        (recipe_id, top(similar_ids, scores))
+        for recipe_id, similar_ids, scores in rows
+    )
+    merge_reverse(rows, targets)
+
+
+def merge_reverse(rows, targets):
+    """Вставляет пересчитанные рецепты в списки их соседей."""
+    reverse = defaultdict(dict)
+    for recipe_id, similar_ids, scores in rows:
+        for similar_id, score in zip(similar_ids.tolist(), scores.tolist()):
+            if similar_id not in targets:
+                reverse[similar_id][int(recipe_id)] = score
+    existing = SimilarRecipe.objects.filter(
+        recipe_id__in=list(reverse)
+    ).values_list('recipe_id', 'similar_id', 'score')
+    for recipe_id, similar_id, score in existing:
+        reverse[recipe_id].setdefault(similar_id, score)
+    store(
+        (
+            recipe_id,
+            heapq.nlargest(
+                settings.SIMILAR_RECIPES_COUNT, scores.items(),
+                key=itemgetter(1)
+            )
+        )
+        for recipe_id, scores in reverse.items()
+    )
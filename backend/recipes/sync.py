@@ -0,0 +1,62 @@
+import heapq
+from itertools import islice
+
+from .models import Change
+
+SECTIONS = {
+    Change.FAVORITE: 'favorites',
+    Change.SHOPPING_CART: 'shopping_cart',
+    Change.SUBSCRIPTION: 'subscriptions',
+}
+
+
+def needs_reset(since):
+    """Изменения после since уже удалены — клиенту нужна полная загрузка.
+
+    prune_changes оставляет на месте удалённого начала журнала метку
+    PRUNE; она всегда самая старая запись, так что проверка — одно
+    чтение по первичному ключу.
+    """
+    oldest = Change.objects.values_list('id', 'operation').first()
+    return (
+        oldest is not None and oldest[1] == Change.PRUNE and since < oldest[0]
+    )
+
+
+def get_changes(user, since, limit):
+    fields = ('id', 'kind', 'object_id', 'operation')
+    streams = [
+        Change.objects.filter(user__isnull=True, id__gt=since).values_list(
+            *fields
+        )[:limit + 1]
+    ]
+    if user.is_authenticated:
+        streams.append(
+            Change.objects.filter(user=user, id__gt=since).values_list(
+                *fields
+            )[:limit + 1]
+        )
+    changes = list(islice(heapq.merge(*streams), limit + 1))
+    return changes[:limit], len(changes) > limit
+
+
+def compact(changes):
+    """Оставляет последнюю операцию для каждого объекта."""
+    latest = {}
+    for _, kind, object_id, operation in changes:
+        latest[kind, object_id] = operation
+    result = {
+        'recipes': {'updated': [], 'deleted': []},
+        **{
+            section: {'added': [], 'removed': []}
+            for section in SECTIONS.values()
+        }
+    }
+    for (kind, object_id), operation in latest.items():
+        if kind == Change.RECIPE:
+            key = 'updated' if operation == Change.UPSERT else 'deleted'
+            result['recipes'][key].append(object_id)
+        else:
+            key = 'added' if operation == Change.UPSERT else 'removed'
+            result[SECTIONS[kind]][key].append(object_id)
+    return result
@@ -0,0 +1,86 @@
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+
+from jobs.queue import task
+from users.models import User
+from . import popularity, similarity, timeline
+from .fast_serializers import backfill_snapshots
+from .models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+
+def shopping_cart_rows(user_id):
+    cart = IngredientInRecipe.objects.filter(
+        recipe__shopping_cart__user_id=user_id).values(
+            'ingredient__name', 'ingredient__measurement_unit').annotate(
+                count=Sum('amount'))
+    for ingredient in cart.iterator():
+        yield '{} - {} {}\n'.format(
+            ingredient['ingredient__name'],
+            ingredient['count'],
+            ingredient['ingredient__measurement_unit'])
+
+
+@task('recipes.shopping_cart')
+def shopping_cart(user_id):
+    return ''.join(shopping_cart_rows(user_id))
+
+
+@task('recipes.fan_out')
+def fan_out(recipe_id):
+    recipe = Recipe.objects.select_related('author').filter(
+        id=recipe_id
+    ).first()
+    if recipe is not None:
+        timeline.fan_out(recipe)
+
+
+@task('recipes.fan_out_author')
+def fan_out_author(author_id):
+    author = User.objects.filter(id=author_id).first()
+    if author is not None:
+        timeline.fan_out_author(author)
+
+
+@task('recipes.refresh_similar')
+def refresh_similar(recipe_ids):
+    similarity.refresh(recipe_ids)
+
+
+@task('recipes.backfill_snapshots')
+def backfill(batch_size=500):
+    return backfill_snapshots(batch_size)
+
+
+@task('recipes.refresh_stats')
+def refresh_stats():
+    return popularity.refresh_stats()
+
+
+@task('recipes.delete_images')
+def delete_images(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+@task('recipes.load_ingredients')
+def load_ingredients(items):
+    return len(Ingredient.objects.bulk_create(
+        (
+            Ingredient(
+                name=item['name'], measurement_unit=item['measurement_unit']
+            )
+            for item in items
+        ),
+        ignore_conflicts=True
+    ))
+
+
+@task('recipes.load_tags')
+def load_tags(items):
+    return len(Tag.objects.bulk_create(
+        (
+            Tag(name=item['name'], color=item['color'], slug=item['slug'])
+            for item in items
+        ),
+        ignore_conflicts=True
+    ))
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from recipes import deletion
+from recipes.membership import FAVORITES, SUBSCRIPTIONS, Membership
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+
+
+@override_settings(MEMBERSHIP_CACHE_TIMEOUT=60)
+class BulkDeletionTest(TransactionTestCase):
+    """Кэш сбрасывается после фиксации, поэтому нужны настоящие транзакции."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        self.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Текст.',
+            image='recipe_images/recipe.png', cooking_time=10
+        )
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+
+    def cached(self, kind):
+        return list(Membership(self.reader).get(kind))
+
+    def test_deleting_recipes_invalidates_other_users(self):
+        self.assertEqual(self.cached(FAVORITES), [self.recipe.id])
+        deletion.delete_recipes(Recipe.objects.filter(id=self.recipe.id))
+        self.assertEqual(self.cached(FAVORITES), [])
+
+    def test_deleting_users_invalidates_subscribers(self):
+        self.assertEqual(self.cached(SUBSCRIPTIONS), [self.author.id])
+        deletion.delete_users(User.objects.filter(id=self.author.id))
+        self.assertEqual(self.cached(FAVORITES), [])
+        self.assertEqual(self.cached(SUBSCRIPTIONS), [])
@@ -0,0 +1,143 @@
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.fast_serializers import (EXPANDABLE_FIELDS, RECIPE_COLUMNS,
+                                      RECIPE_FIELDS, get_documents,
+                                      serialize_recipes)
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            RecipeSnapshot, ShoppingCart, Tag)
+from recipes.renderers import FastJSONRenderer
+from recipes.serializers import RecipeSerializer
+from users.models import Subscription, User
+
+
+class FastReadParityTest(TestCase):
+    """Быстрый путь чтения отдаёт те же байты, что RecipeSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x',
+            first_name='Иван', last_name='Петров'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x',
+            first_name='Анна', last_name='Смирнова'
+        )
+        breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        lunch = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+        cls.omelette = Recipe.objects.create(
+            author=cls.author, name='Омлет', text='Взбить и пожарить.',
+            image='recipe_images/omelette.png', cooking_time=10
+        )
+        cls.omelette.tags.set([lunch, breakfast])
+        for ingredient, amount in ((eggs, 3), (milk, 100), (salt, 2)):
+            IngredientInRecipe.objects.create(
+                recipe=cls.omelette, ingredient=ingredient, amount=amount
+            )
+        cls.porridge = Recipe.objects.create(
+            author=cls.reader, name='Каша', text='Варить.',
+            image='recipe_images/porridge.png', cooking_time=20
+        )
+        cls.porridge.tags.set([breakfast])
+        IngredientInRecipe.objects.create(
+            recipe=cls.porridge, ingredient=milk, amount=300
+        )
+        Favorite.objects.create(user=cls.reader, recipe=cls.omelette)
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.porridge)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+
+    def get_request(self, user=None):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        if user is not None:
+            request.force_user = user
+            request.user = user
+        return request
+
+    def assert_parity(self, request, fields=RECIPE_FIELDS):
+        recipes = Recipe.objects.all()
+        expected = [
+            {field: recipe[field] for field in fields}
+            for recipe in RecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+        ]
+        actual = serialize_recipes(
+            recipes.values(*RECIPE_COLUMNS), request, fields,
+            EXPANDABLE_FIELDS
+        )
+        self.assertEqual(
+            FastJSONRenderer().render(actual),
+            JSONRenderer().render(expected)
+        )
+
+    def test_parity(self):
+        cases = {
+            'anonymous': None,
+            'reader': self.reader,
+            'author': self.author,
+        }
+        for snapshots in (False, True):
+            for name, user in cases.items():
+                with self.subTest(snapshots=snapshots, user=name):
+                    with override_settings(RECIPE_SNAPSHOTS=snapshots):
+                        self.assert_parity(self.get_request(user))
+
+    def test_parity_with_fields(self):
+        fields = ('id', 'author', 'is_favorited', 'name', 'ingredients')
+        for snapshots in (False, True):
+            with self.subTest(snapshots=snapshots):
+                with override_settings(RECIPE_SNAPSHOTS=snapshots):
+                    self.assert_parity(self.get_request(self.reader), fields)
+
+    def test_fields_without_expand_keep_objects(self):
+        response = self.client.get(
+            f'/api/recipes/{self.omelette.id}/', {'fields': 'id,author,tags'}
+        )
+        self.assertEqual(response.json()['author']['id'], self.author.id)
+        self.assertEqual(
+            [tag['slug'] for tag in response.json()['tags']],
+            ['breakfast', 'lunch']
+        )
+
+    def test_empty_expand_returns_ids(self):
+        response = self.client.get(
+            f'/api/recipes/{self.omelette.id}/',
+            {'fields': 'id,author', 'expand': ''}
+        )
+        self.assertEqual(
+            response.json(), {'id': self.omelette.id, 'author': self.author.id}
+        )
+
+    def test_ids_keep_requested_order(self):
+        for ids in (
+            [self.porridge.id, self.omelette.id],
+            [self.omelette.id, self.porridge.id],
+        ):
+            with self.subTest(ids=ids):
+                response = self.client.get('/api/recipes/', {
+                    'ids': ','.join(map(str, ids)), 'fields': 'id'
+                })
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.json()], ids
+                )
+
+    def test_retrieve_non_integer_id(self):
+        self.assertEqual(self.client.get('/api/recipes/abc/').status_code, 404)
+
+    def test_author_snapshots_survive_unrelated_saves(self):
+        get_documents([self.omelette.id])
+        snapshots = RecipeSnapshot.objects.filter(recipe=self.omelette)
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertTrue(snapshots.exists())
+        self.author.last_name = 'Сидоров'
+        self.author.save()
+        self.assertFalse(snapshots.exists())
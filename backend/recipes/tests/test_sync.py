@@ -0,0 +1,83 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import (Change, Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, Tag)
+from users.models import User
+
+
+class SyncTest(TransactionTestCase):
+    """Журнал пишется после фиксации, поэтому нужны настоящие транзакции."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='Обед', color='#000', slug='lunch')
+        self.salt = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+
+    def create_recipe(self, name):
+        recipe = Recipe.objects.create(
+            author=self.user, name=name, text='Текст.',
+            image='recipe_images/recipe.png', cooking_time=10
+        )
+        recipe.tags.set([self.tag])
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=self.salt, amount=1
+        )
+        return recipe
+
+    def sync(self, since):
+        return self.client.get('/api/sync/', {'since': since}).json()
+
+    def test_changes_since_cursor(self):
+        first = self.create_recipe('Первый')
+        cursor = self.sync(0)['cursor']
+        second = self.create_recipe('Второй')
+        Favorite.objects.create(user=self.user, recipe=first)
+        data = self.sync(cursor)
+        self.assertFalse(data['reset'])
+        self.assertEqual(
+            [recipe['id'] for recipe in data['recipes']['updated']],
+            [second.id]
+        )
+        self.assertEqual(
+            data['recipes']['updated'][0]['ingredients'][0]['id'],
+            self.salt.id
+        )
+        self.assertEqual(data['favorites']['added'], [first.id])
+
+    def test_change_is_written_on_commit(self):
+        recipe = self.create_recipe('Рецепт')
+        self.assertTrue(
+            Change.objects.filter(
+                kind=Change.RECIPE, object_id=recipe.id
+            ).exists()
+        )
+
+    def test_pruned_log_requires_reset(self):
+        for number in range(3):
+            self.create_recipe(f'Рецепт {number}')
+        Change.objects.update(created=timezone.now() - timedelta(days=365))
+        call_command('prune_changes', stdout=StringIO())
+        marker = Change.objects.get()
+        self.assertEqual(marker.operation, Change.PRUNE)
+        for since in (0, marker.id - 1):
+            with self.subTest(since=since):
+                data = self.sync(since)
+                self.assertTrue(data['reset'])
+                self.assertEqual(data['cursor'], marker.id)
+        self.assertFalse(self.sync(marker.id)['reset'])
+
+    def test_fresh_log_needs_no_reset(self):
+        self.create_recipe('Рецепт')
+        self.assertFalse(self.sync(0)['reset'])
@@ -0,0 +1,85 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from recipes import throttling
+from recipes.checks import check_throttle_cache
+
+RATES = {'export': '10/min'}
+
+
+class View:
+    throttle_scope = 'export'
+
+
+class SlidingWindowThrottleTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.dict(
+            api_settings.DEFAULT_THROTTLE_RATES, RATES, clear=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(throttling, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = Request(APIRequestFactory().get('/api/recipes/'))
+
+    def allow(self):
+        return throttling.SlidingWindowThrottle().allow_request(
+            self.request, View()
+        )
+
+    def test_limit_within_window(self):
+        with mock.patch('time.time', return_value=60.0):
+            self.assertEqual(
+                [self.allow() for _ in range(11)], [True] * 10 + [False]
+            )
+
+    def test_previous_window_decays(self):
+        with mock.patch('time.time', return_value=60.0):
+            for _ in range(10):
+                self.allow()
+        with mock.patch('time.time', return_value=150.0):
+            self.assertEqual(
+                [self.allow() for _ in range(6)], [True] * 5 + [False]
+            )
+
+    def test_rejections_do_not_consume(self):
+        with mock.patch('time.time', return_value=60.0):
+            for _ in range(15):
+                self.allow()
+        with mock.patch('time.time', return_value=150.0):
+            self.assertEqual(
+                [self.allow() for _ in range(6)], [True] * 5 + [False]
+            )
+
+    def test_concurrent_requests_share_the_limit(self):
+        allowed = []
+        start = threading.Barrier(20)
+
+        def run():
+            start.wait()
+            allowed.append(self.allow())
+
+        with mock.patch('time.time', return_value=60.0):
+            threads = [threading.Thread(target=run) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(allowed.count(True), 10)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache_fails_deploy_check(self):
+        self.assertEqual(
+            [error.id for error in check_throttle_cache(None)],
+            ['recipes.E001']
+        )
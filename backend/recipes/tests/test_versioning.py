@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.serializers import RecipeSerializer
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DUPLICATE_RECIPE_POLICY='off')
+class RecipeVersionTest(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        self.client.force_authenticate(self.author)
+        self.tag = Tag.objects.create(name='Обед', color='#000', slug='lunch')
+        self.salt, self.eggs = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйца')
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Омлет', text='Пожарить.',
+            image='recipe_images/omelette.png', cooking_time=10
+        )
+        self.recipe.tags.set([self.tag])
+        IngredientInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.salt, amount=1
+        )
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def get_data(self, **changes):
+        return {
+            'name': 'Омлет с яйцами', 'text': 'Взбить.', 'cooking_time': 5,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.eggs.id, 'amount': 2}],
+            **changes,
+        }
+
+    def test_retrieve_sends_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], f'"{self.recipe.id}-1"')
+
+    def test_update_with_current_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(
+            self.url, self.get_data(), format='json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], f'"{self.recipe.id}-2"')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, 2)
+        self.assertEqual(
+            list(self.recipe.ingredients.values_list('id', flat=True)),
+            [self.eggs.id]
+        )
+
+    def test_weak_etag_matches(self):
+        response = self.client.patch(
+            self.url, self.get_data(), format='json',
+            HTTP_IF_MATCH=f'W/"{self.recipe.id}-1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_stale_etag_is_rejected(self):
+        self.client.patch(self.url, self.get_data(), format='json')
+        response = self.client.patch(
+            self.url, self.get_data(name='Другой'), format='json',
+            HTTP_IF_MATCH=f'"{self.recipe.id}-1"'
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Омлет с яйцами')
+
+    def test_concurrent_update_writes_nothing(self):
+        check_duplicates = RecipeSerializer.check_duplicates
+
+        def concurrent_update(serializer, *args, **kwargs):
+            Recipe.objects.filter(id=self.recipe.id).update(version=5)
+            return check_duplicates(serializer, *args, **kwargs)
+
+        with mock.patch.object(
+            RecipeSerializer, 'check_duplicates', concurrent_update
+        ):
+            response = self.client.put(
+                self.url, self.get_data(image=IMAGE), format='json'
+            )
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Омлет')
+        self.assertEqual(self.recipe.image.name, 'recipe_images/omelette.png')
+        self.assertEqual(
+            list(self.recipe.ingredients.values_list('id', flat=True)),
+            [self.salt.id]
+        )
+
+    def test_failed_update_removes_new_image(self):
+        preprocess = mock.patch.object(
+            RecipeSerializer, 'preprocess_recipe', side_effect=RuntimeError
+        )
+        delete = mock.patch(
+            'django.core.files.storage.FileSystemStorage.delete'
+        )
+        with preprocess, delete as deleted:
+            with self.assertRaises(RuntimeError):
+                self.client.put(
+                    self.url, self.get_data(image=IMAGE), format='json'
+                )
+        deleted.assert_called_once()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, 1)
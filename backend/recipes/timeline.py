@@ -0,0 +1,144 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from jobs.queue import enqueue
+from users.models import Subscription, User
+from .models import Recipe, TimelineEntry
+
+INSERT_BATCH_SIZE = 1000
+
+
+def is_celebrity(author):
+    return author.followers_count >= settings.TIMELINE_FANOUT_LIMIT
+
+
+def insert(entries):
+    """Вставляет записи лент пачками, не держа в памяти весь поток.
+
+    Размер запроса внутри пачки Django подбирает под ограничения БД.
+    """
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, INSERT_BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if is_celebrity(recipe.author):
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    insert(
+        TimelineEntry(
+            user_id=user_id, recipe_id=recipe.id, author_id=recipe.author_id
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def latest_recipes(author):
+    return list(Recipe.objects.filter(author=author).values_list(
+        'id', flat=True
+    )[:settings.TIMELINE_LENGTH])
+
+
+def backfill(user, author):
+    if is_celebrity(author):
+        return
+    insert(
+        TimelineEntry(
+            user_id=user.id, recipe_id=recipe_id, author_id=author.id
+        )
+        for recipe_id in latest_recipes(author)
+    )
+
+
+def fan_out_author(author):
+    """Раскладывает последние рецепты автора по лентам всех подписчиков.
+
+    Нужна, когда автор опустился ниже TIMELINE_FANOUT_LIMIT: его рецепты
+    перестают подмешиваться при чтении, а в ленты их ещё не добавляли.
+    """
+    if is_celebrity(author):
+        return
+    recipes = latest_recipes(author)
+    followers = Subscription.objects.filter(author=author).values_list(
+        'user_id', flat=True
+    )
+    insert(
+        TimelineEntry(
+            user_id=user_id, recipe_id=recipe_id, author_id=author.id
+        )
+        for user_id in followers.iterator()
+        for recipe_id in recipes
+    )
+
+
+def follower_added(author_id):
+    User.objects.filter(id=author_id).update(
+        followers_count=F('followers_count') + 1
+    )
+
+
+def follower_removed(author_id):
+    """Уменьшает счётчик подписчиков автора.
+
+    Строка автора заблокирована обновлением до конца транзакции, поэтому
+    переход через порог видит ровно одна отписка.
+    """
+    User.objects.filter(id=author_id).update(
+        followers_count=F('followers_count') - 1
+    )
+    if User.objects.filter(
+        id=author_id, followers_count=settings.TIMELINE_FANOUT_LIMIT - 1
+    ).exists():
+        transaction.on_commit(lambda: enqueue(
+            'recipes.fan_out_author', author_id=author_id
+        ))
+
+
+def prune(user, author):
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def trim(user):
+    boundary = TimelineEntry.objects.filter(user=user).order_by(
+        '-recipe_id'
+    ).values_list('recipe_id', flat=True)[
+        settings.TIMELINE_LENGTH:settings.TIMELINE_LENGTH + 1
+    ]
+    if boundary:
+        TimelineEntry.objects.filter(
+            user=user, recipe_id__lte=boundary[0]
+        ).delete()
+
+
+def get_feed(user, before, limit):
+    """Возвращает id рецептов ленты по убыванию, не старше before.
+
+    Рецепты авторов с большим числом подписчиков в ленты не раскладываются
+    и подмешиваются при чтении.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    recipes = Recipe.objects.filter(
+        author__in=Subscription.objects.filter(
+            user=user,
+            author__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+        ).values('author')
+    )
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        recipes = recipes.filter(id__lt=before)
+    ids = set(entries.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit])
+    ids.update(recipes.order_by('-id').values_list('id', flat=True)[:limit])
+    return heapq.nlargest(limit, ids)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import IngredientViewSet, RecipeViewSet, SyncView, TagViewSet
 
 app_name = 'recipes'
 
@@ -12,4 +12,5 @@ router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
     path('', include(router_v1.urls)),
+    path('sync/', SyncView.as_view(), name='sync'),
 ]
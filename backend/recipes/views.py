@@ -1,25 +1,64 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db.models import Max
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.serializers import ValidationError
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from jobs.queue import enqueue
+from jobs.views import accepted
+from . import sync, timeline
+from .fast_serializers import (get_columns, get_fieldset, serialize_ids,
+                               serialize_recipes)
 from .filters import RecipeFilter
-from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag)
+from .membership import FAVORITES, SHOPPING_CART, get_membership
+from .models import (Change, Favorite, Ingredient, Recipe, ShoppingCart,
+                     SimilarRecipe, Tag)
 from .permissions import IsAuthorOrAdminOrReadOnly
 from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeSerializer, ShoppingCartSerializer,
-                          TagSerializer)
+                          PreconditionFailed, RecipeSerializer,
+                          ShoppingCartSerializer, TagSerializer)
+from .tasks import shopping_cart_rows
 
 RECIPE_ALREADY_IN_SHOPPING_CART = 'Рецепт уже в корзине!'
 RECIPE_NOT_IN_SHOPPING_CART = 'Рецепта нет в корзине!'
 RECIPE_ALREADY_IN_FAVORITES = 'Вы уже добавили рецепт в избранное!'
 RECIPE_NOT_IN_FAVORITES = 'Рецепта нет в избранных!'
 RECIPE_NOT_EXISTS = 'Рецепт не существует!'
+INTEGER_REQUIRED = 'Ожидается целое число не меньше {}.'
+
+
+def get_int(request, param, default=None, min_value=1):
+    value = request.query_params.get(param)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        value = None
+    if value is None or value < min_value:
+        raise ValidationError({param: INTEGER_REQUIRED.format(min_value)})
+    return value
+
+
+def get_etag(pk, version):
+    return f'"{pk}-{version}"'
+
+
+def if_match(request, etag):
+    """Проверка If-Match; W/ допускается: сжатие ослабляет ETag."""
+    header = request.META.get('HTTP_IF_MATCH', '*').strip()
+    if header == '*':
+        return True
+    return etag in {
+        value.strip().replace('W/', '', 1) for value in header.split(',')
+    }
 
 
 class IngredientViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin,
@@ -29,6 +68,7 @@ class IngredientViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin,
     permission_classes = (AllowAny,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('^name',)
+    throttle_scope = 'search'
 
 
 class TagViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin,
@@ -44,12 +84,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_scopes = {
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'destroy': 'write',
+        'favorite': 'write',
+        'shopping_cart': 'write',
+        'download_shopping_cart': 'export',
+    }
+    concurrency_scopes = {
+        'list': 'list',
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'download_shopping_cart': 'export',
+    }
+
+    def list(self, request, *args, **kwargs):
+        fields, expand = get_fieldset(request)
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *get_columns(fields, expand)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serialize_recipes(page, request, fields, expand)
+            )
+        return Response(serialize_recipes(queryset, request, fields, expand))
+
+    def retrieve(self, request, *args, **kwargs):
+        fields, expand = get_fieldset(request)
+        row = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(
+                *get_columns(fields, expand), 'version'
+            ),
+            pk=kwargs['pk']
+        )
+        response = Response(
+            serialize_recipes([row], request, fields, expand)[0]
+        )
+        response['ETag'] = get_etag(row['id'], row['version'])
+        return response
+
+    def update(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        if not if_match(request, get_etag(recipe.id, recipe.version)):
+            raise PreconditionFailed
+        serializer = self.get_serializer(
+            recipe, data=request.data, partial=kwargs.get('partial', False)
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(version=recipe.version)
+        response = Response(serializer.data)
+        response['ETag'] = get_etag(recipe.id, recipe.version)
+        return response
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def favorite_or_cart(self, request, id, model, message_not_in, message_in,
-                         class_serializer):
+                         class_serializer, kind):
         user = request.user
         recipe = get_object_or_404(Recipe, id=id)
         if request.method == 'DELETE':
@@ -60,6 +155,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             obj.delete()
+            get_membership(request).changed(kind, recipe.id, False)
             return Response(status=status.HTTP_204_NO_CONTENT)
         if model.objects.filter(recipe=recipe, user=user).exists():
             return Response(
@@ -69,6 +165,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = class_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(user=user, recipe=recipe)
+        get_membership(request).changed(kind, recipe.id, True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(methods=('POST', 'DELETE'), detail=False,
@@ -77,7 +174,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorite(self, request, id):
         return self.favorite_or_cart(
             request, id, Favorite, RECIPE_NOT_IN_FAVORITES,
-            RECIPE_ALREADY_IN_FAVORITES, FavoriteSerializer
+            RECIPE_ALREADY_IN_FAVORITES, FavoriteSerializer, FAVORITES
         )
 
     @action(methods=('POST', 'DELETE'), detail=False,
@@ -86,21 +183,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, id):
         return self.favorite_or_cart(
             request, id, ShoppingCart, RECIPE_NOT_IN_SHOPPING_CART,
-            RECIPE_ALREADY_IN_SHOPPING_CART, ShoppingCartSerializer
+            RECIPE_ALREADY_IN_SHOPPING_CART, ShoppingCartSerializer,
+            SHOPPING_CART
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        before = get_int(request, 'before')
+        limit = min(
+            get_int(request, 'limit', settings.TIMELINE_PAGE_SIZE),
+            settings.TIMELINE_LENGTH
         )
+        if before is None:
+            timeline.trim(request.user)
+        ids = timeline.get_feed(request.user, before, limit)
+        next_url = None
+        if len(ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'before', ids[-1]
+            )
+        return Response({
+            'next': next_url,
+            'results': serialize_ids(request, ids),
+        })
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        get_object_or_404(Recipe, pk=pk)
+        limit = get_int(
+            request, 'limit', settings.SIMILAR_RECIPES_COUNT
+        )
+        ids = SimilarRecipe.objects.filter(recipe_id=pk).values_list(
+            'similar_id', flat=True
+        )[:limit]
+        return Response(serialize_ids(request, list(ids)))
 
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
-        cart = IngredientInRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user).values(
-                'ingredient__name', 'ingredient__measurement_unit').annotate(
-                    count=Sum('amount'))
-        response = HttpResponse(content_type='text/plain')
+        if request.query_params.get('async'):
+            return accepted(
+                request,
+                enqueue(
+                    'recipes.shopping_cart', user=request.user,
+                    user_id=request.user.id
+                )
+            )
+        response = StreamingHttpResponse(
+            shopping_cart_rows(request.user.id), content_type='text/plain'
+        )
         response['Content-Disposition'] = 'attachment; filename="cart.txt"'
-        for ingredient in cart:
-            row = '{} - {} {}\n'.format(
-                ingredient['ingredient__name'],
-                ingredient['count'],
-                ingredient['ingredient__measurement_unit'])
-            response.write(row)
         return response
+
+
+class SyncView(APIView):
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        since = get_int(request, 'since', 0, min_value=0)
+        limit = min(
+            get_int(request, 'limit', settings.SYNC_BATCH_SIZE),
+            settings.SYNC_MAX_BATCH_SIZE
+        )
+        if sync.needs_reset(since):
+            return Response({
+                'reset': True,
+                'cursor': Change.objects.aggregate(cursor=Max('id'))['cursor'],
+            })
+        changes, has_more = sync.get_changes(request.user, since, limit)
+        data = sync.compact(changes)
+        data['recipes']['updated'] = serialize_ids(
+            request, data['recipes']['updated']
+        )
+        return Response({
+            'reset': False,
+            'cursor': changes[-1][0] if changes else since,
+            'has_more': has_more,
+            **data,
+        })
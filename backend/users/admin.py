@@ -1,10 +1,17 @@
 from django.contrib import admin
 
+from recipes import deletion
+from recipes.admin import BulkDeleteMixin
+from recipes.paginations import EstimatedCountPaginator
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(BulkDeleteMixin, admin.ModelAdmin):
     list_display = ('id', 'email', 'username', 'first_name', 'last_name',
                     'password')
-    list_filter = ('email', 'username')
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('^username', '^email', 'first_name', 'last_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    bulk_delete = staticmethod(deletion.delete_users)
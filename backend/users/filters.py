@@ -0,0 +1,22 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+TRIGRAM_MIN_LENGTH = 3
+
+
+def search_users(queryset, term):
+    """Поиск по началу для коротких строк и по подстроке для длинных.
+
+    Подстрока обслуживается триграммными индексами, которые бесполезны
+    короче трёх символов; для таких строк есть индексы text_pattern_ops.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    lookup = 'icontains' if len(term) >= TRIGRAM_MIN_LENGTH else 'istartswith'
+    return queryset.filter(reduce(or_, (
+        Q(**{f'{field}__{lookup}': term}) for field in SEARCH_FIELDS
+    )))
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.http import JsonResponse
+from rest_framework import status
+
+HASHING_BUSY = 'Слишком много входов и регистраций, повторите позже.'
+
+
+class HashingBusy(Exception):
+    """Все места для хеширования заняты; отвечает HashingBusyMiddleware."""
+
+
+class HashingBusyMiddleware:
+    """Отвечает 503 с Retry-After на HashingBusy.
+
+    Исключение не относится к DRF, поэтому доходит сюда и из API, и из
+    обычных представлений вроде входа в админку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+        response = JsonResponse(
+            {'detail': HASHING_BUSY},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            json_dumps_params={'ensure_ascii': False}
+        )
+        response['Retry-After'] = settings.PASSWORD_HASHING_RETRY_AFTER
+        return response
+
+
+def encode(password):
+    return hashers.make_password(password)
+
+
+def verify(password, encoded):
+    rehashed = []
+    valid = hashers.check_password(
+        password, encoded,
+        setter=lambda raw: rehashed.append(hashers.make_password(raw))
+    )
+    return valid, rehashed[0] if rehashed else None
+
+
+class HashingPool:
+    """Пул процессов для хеширования паролей в пределах одного воркера.
+
+    Поток запроса ждёт результата, поэтому хешированием заняты не больше
+    PASSWORD_HASHING_QUEUE потоков воркера (в настройках это меньше
+    числа потоков), а остальные запросы на хеширование сразу получают
+    503. Так у воркера всегда остаётся поток для чтения. Общей границы
+    на хост нет: процессов хеширования будет по
+    PASSWORD_HASHING_WORKERS на каждый воркер gunicorn.
+
+    Процессы запускаются через forkserver: пул создаётся в потоке запроса,
+    и fork многопоточного воркера мог бы унести в дочерний процесс
+    захваченные другими потоками блокировки логирования или драйвера БД.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.executor = None
+        self.slots = None
+
+    def get(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+                self.executor = ProcessPoolExecutor(
+                    settings.PASSWORD_HASHING_WORKERS, mp_context=context
+                )
+                self.slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASHING_QUEUE
+                )
+                self.pid = os.getpid()
+            return self.executor, self.slots
+
+    def reset(self):
+        with self.lock:
+            self.pid = None
+
+    def run(self, func, *args):
+        if not settings.PASSWORD_HASHING_WORKERS:
+            return func(*args)
+        executor, slots = self.get()
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            self.reset()
+            return func(*args)
+        finally:
+            slots.release()
+
+
+pool = HashingPool()
+
+
+def make_password(password):
+    if password is None:
+        return hashers.make_password(None)
+    return pool.run(encode, password)
+
+
+def check_password(password, encoded):
+    """(верен ли пароль, новый хеш или None, если обновлять не нужно)."""
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, None
+    return pool.run(verify, password, encoded)
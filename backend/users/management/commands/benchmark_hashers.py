@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from users import hashing
+
+PASSWORD = 'benchmark-password'
+
+
+def argon2_hasher(config):
+    time_cost, memory_cost, parallelism = map(int, config.split(','))
+    return type('Argon2PasswordHasher', (Argon2PasswordHasher,), {
+        'time_cost': time_cost,
+        'memory_cost': memory_cost,
+        'parallelism': parallelism,
+    })()
+
+
+def rate(func, seconds):
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        func()
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = 'Измеряет число хешей в секунду для настроенных хешеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hashers', nargs='*', default=settings.PASSWORD_HASHERS
+        )
+        parser.add_argument(
+            '--argon2', nargs='*', default=[], metavar='T,M,P',
+            help='Дополнительные параметры Argon2: time,memory,parallelism.'
+        )
+        parser.add_argument('--seconds', type=float, default=2)
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        hashers = [
+            (path, import_string(path)()) for path in options['hashers']
+        ] + [
+            (f'argon2 {config}', argon2_hasher(config))
+            for config in options['argon2']
+        ]
+        for name, hasher in hashers:
+            salt = hasher.salt()
+            self.stdout.write('{}: {:.1f} хешей/с'.format(
+                name, rate(lambda: hasher.encode(PASSWORD, salt), seconds)
+            ))
+        self.stdout.write('Пул ({} процессов): {:.1f} хешей/с'.format(
+            settings.PASSWORD_HASHING_WORKERS, self.pool_rate(seconds)
+        ))
+
+    def pool_rate(self, seconds):
+        threads = settings.PASSWORD_HASHING_QUEUE
+        with ThreadPoolExecutor(threads) as executor:
+            rates = executor.map(
+                lambda _: rate(
+                    lambda: hashing.make_password(PASSWORD), seconds
+                ),
+                range(threads)
+            )
+            return sum(rates)
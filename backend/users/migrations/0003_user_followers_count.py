@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_followers(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+    counts = Subscription.objects.values('author').annotate(
+        count=Count('id')
+    )
+    for row in counts.iterator():
+        User.objects.filter(id=row['author']).update(
+            followers_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20220427_0905'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ('id',), 'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=models.CharField(max_length=150, unique=True, verbose_name='Логин'),
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ('username', 'first_name', 'last_name')
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('users', 'User')._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_upper_like '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_upper_trgm '
+            f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('users', 'User')._meta.db_table
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_{column}_upper_like'
+        )
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_{column}_upper_trgm'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from . import hashing
+
 
 class User(AbstractUser):
     username = models.CharField('Логин', unique=True, max_length=150)
@@ -9,12 +11,26 @@ class User(AbstractUser):
     email = models.EmailField(
         verbose_name='Почта', max_length=254, unique=True
     )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков', default=0
+    )
 
     class Meta:
         ordering = ('id',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        valid, rehashed = hashing.check_password(raw_password, self.password)
+        if rehashed is not None:
+            self.password = rehashed
+            self.save(update_fields=['password'])
+        return valid
+
 
 class Subscription(models.Model):
     user = models.ForeignKey(
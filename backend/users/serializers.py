@@ -1,6 +1,8 @@
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from recipes.fieldsets import SparseFieldsMixin
+from recipes.membership import SUBSCRIPTIONS, get_membership
 from recipes.models import Recipe
 from .models import Subscription, User
 
@@ -13,15 +15,12 @@ class UserCreateSerializer(UserCreateSerializer):
         )
 
 
-class UserSerializer(UserSerializer):
+class UserSerializer(SparseFieldsMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Subscription.objects.filter(user=user, author=author).exists()
-        )
+        membership = get_membership(self.context.get('request'))
+        return membership.contains(SUBSCRIPTIONS, author.id)
 
     class Meta:
         model = User
@@ -42,7 +41,8 @@ class RecipeInSubscriptionSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SparseFieldsMixin,
+                             serializers.ModelSerializer):
     email = serializers.ReadOnlyField(source='author.email')
     id = serializers.ReadOnlyField(source='author.id')
     username = serializers.ReadOnlyField(source='author.username')
@@ -53,14 +53,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     recipes_count = serializers.ReadOnlyField(source='author.recipes.count')
 
     def get_is_subscribed(self, subscription):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and Subscription.objects.filter(
-                user=user,
-                author=subscription.author
-            ).exists()
-        )
+        membership = get_membership(self.context.get('request'))
+        return membership.contains(SUBSCRIPTIONS, subscription.author_id)
 
     def get_recipes(self, subscription):
         request = self.context.get('request')
@@ -1,7 +1,7 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import UserViewSet
+from .views import TokenCreateView, UserViewSet
 
 app_name = 'users'
 
@@ -10,5 +10,8 @@ router.register('users', UserViewSet, basename='users')
 
 urlpatterns = [
     path('', include(router.urls)),
+    re_path(
+        r'^auth/token/login/?$', TokenCreateView.as_view(), name='login'
+    ),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,11 +1,18 @@
 from django.shortcuts import get_object_or_404
+from djoser import views
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
+from rest_framework.settings import api_settings
 
+from recipes import timeline
+from recipes.fieldsets import parse_fields
+from recipes.membership import SUBSCRIPTIONS, get_membership
+from recipes.paginations import EstimatedCountPagination, IdCursorPagination
+from .filters import search_users
 from .models import Subscription, User
 from .serializers import (SubscriptionSerializer, UserCreateSerializer,
                           UserSerializer)
@@ -13,6 +20,11 @@ from .serializers import (SubscriptionSerializer, UserCreateSerializer,
 SUBSCRIBE_TO_YOURSELF = 'Вы не можете подписаться на себя.'
 SUBSCRIPTION_DOES_NOT_EXIST = 'Подписка не существует.'
 SUBSCRIPTION_ALREADY_EXISTS = 'Подписка уже существует.'
+SPARSE_ACTIONS = ('list', 'directory', 'retrieve', 'me', 'subscriptions')
+
+
+class TokenCreateView(views.TokenCreateView):
+    throttle_scope = 'auth'
 
 
 class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
@@ -20,12 +32,41 @@ class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = EstimatedCountPagination
+    throttle_scopes = {
+        'list': 'search',
+        'directory': 'search',
+        'create': 'auth',
+        'set_password': 'auth',
+        'subscribe': 'write',
+    }
 
     def get_permissions(self):
         if self.action == 'create' or self.action == 'list':
             return (AllowAny(),)
         return super().get_permissions()
 
+    def get_fields(self):
+        if self.action not in SPARSE_ACTIONS:
+            return None
+        return parse_fields(
+            self.request, 'fields', self.get_serializer_class().Meta.fields
+        )
+
+    def get_queryset(self):
+        fields = self.get_fields()
+        if fields is None or self.action == 'subscriptions':
+            return super().get_queryset()
+        return super().get_queryset().only(
+            'id', *(field for field in fields if field != 'is_subscribed')
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return UserCreateSerializer
@@ -35,6 +76,18 @@ class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
             return SubscriptionSerializer
         return UserSerializer
 
+    @action(
+        methods=['GET'], detail=False, permission_classes=(AllowAny,),
+        pagination_class=IdCursorPagination
+    )
+    def directory(self, request):
+        page = self.paginate_queryset(search_users(
+            self.get_queryset(),
+            request.query_params.get(api_settings.SEARCH_PARAM, '')
+        ))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(methods=['GET'], detail=False)
     def me(self, request):
         user = get_object_or_404(User, username=request.user.username)
@@ -67,12 +120,17 @@ class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
             if not subscription:
                 raise ValidationError(SUBSCRIPTION_DOES_NOT_EXIST)
             subscription.delete()
+            timeline.prune(user, author)
+            get_membership(request).changed(SUBSCRIPTIONS, author.id, False)
             return Response(status=status.HTTP_204_NO_CONTENT)
         if Subscription.objects.filter(author=author, user=user).exists():
             raise ValidationError(SUBSCRIPTION_ALREADY_EXISTS)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(user=user, author=author)
+        author.refresh_from_db(fields=['followers_count'])
+        timeline.backfill(user, author)
+        get_membership(request).changed(SUBSCRIPTIONS, author.id, True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(methods=['GET'], detail=False)